@@ -0,0 +1,5 @@
+"""
+Benchmarks
+Stand alone performance measurements for the plotting pipeline.
+Each module can be run directly, e.g. python -m benchmarks.bench_parse
+"""
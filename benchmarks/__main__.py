@@ -0,0 +1,97 @@
+"""
+Benchmark runner
+Runs every benchmark headless, writes the results as JSON and optionally compares them
+against a stored baseline.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline baseline.json --threshold 0.1
+
+Metrics ending in _per_sec are better when higher, every other metric (times, latencies,
+bytes, lost points) is better when lower. A metric is a regression when it is worse than
+the baseline by more than the threshold, the runner then exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from benchmarks import bench_export, bench_faults, bench_idle, bench_link, bench_parse, bench_plotter, bench_replay, bench_transform
+
+
+BENCHMARKS = {
+    "parse": bench_parse.run,
+    "transform": bench_transform.run,
+    "plotter": bench_plotter.run,
+    "link": bench_link.run,
+    "replay": bench_replay.run,
+    "export": bench_export.run,
+    "idle": bench_idle.run,
+    "faults": bench_faults.run,
+}
+REGRESSION_THRESHOLD = 0.10
+# differences below this are noise for metrics that sit near zero
+ABSOLUTE_TOLERANCE = 1e-3
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_sec")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    @return list of (metric, baseline value, new value, relative change) for every
+    metric in both runs that got worse by more than threshold
+    """
+    regressions = []
+    for metric, value in sorted(results.items()):
+        previous = baseline.get(metric)
+        if previous is None or abs(value - previous) <= ABSOLUTE_TOLERANCE:
+            continue
+        change = (value - previous) / abs(previous) if previous else float("inf")
+        worse = -change if higher_is_better(metric) else change
+        if worse > threshold:
+            regressions.append((metric, previous, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the plotting pipeline benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        print(f"[{name}]")
+        for metric, value in BENCHMARKS[name]().items():
+            results[metric] = float(value)
+            print(f"    {metric:>36}: {value:,.3f}")
+
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)["results"], args.threshold)
+        for metric, previous, value, change in regressions:
+            print(f"REGRESSION {metric}: {previous:,.3f} -> {value:,.3f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
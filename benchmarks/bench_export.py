@@ -0,0 +1,35 @@
+"""
+Export Benchmark
+Writes a full point store as binary PLY and PCD to a temporary directory and reports
+points written per second.
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from realtimeplotter.export import EXPORT_FORMATS, export_store
+from realtimeplotter.point_store import PointStore
+
+
+POINT_COUNT = 2_000_000
+
+
+def run(point_count=POINT_COUNT):
+    rng = np.random.default_rng(12345)
+    store = PointStore(point_count)
+    store.append(rng.normal(0.0, 1000.0, (point_count, 3)))
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for export_format in EXPORT_FORMATS:
+            path = os.path.join(directory, f"scan.{export_format}")
+            start = time.perf_counter()
+            export_store(path, store)
+            results[f"export_{export_format}_points_per_sec"] = point_count / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>32}: {value:,.0f}")
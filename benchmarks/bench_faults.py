@@ -0,0 +1,66 @@
+"""
+Faults Benchmark
+The link benchmark with serial noise: every batch goes through the simulator's
+FaultInjector on its way into the pty link, so throughput, loss and latency show what
+corrupted, cut, dropped, duplicated, reordered and stalled data costs the receiver.
+
+Recovery is measured on the decoder alone: a burst of random bytes lands between two
+runs of good records, the good records lost after the burst is how long the decoder
+takes to fall back into step.
+"""
+import numpy as np
+
+from benchmarks.common import app_instance
+from realtimeplotter.protocol import WIRE_FORMATS, encode_points, make_decoder
+from simulation.plot_simulation import FaultInjector, parse_faults, scatter_points
+from simulation.virtual_link import run_link
+
+
+POINT_COUNT = 100_000
+BATCH_SIZE = 1_000
+FAULT_SPEC = "corrupt=0.0001&truncate=0.005&drop=0.001&duplicate=0.005&reorder=0.005&jitter=2&stall=0.01&stall_time=100"
+RECOVERY_BURSTS = 200
+RECOVERY_BURST_BYTES = 256
+RECOVERY_RECORDS = 100
+READ_SIZE = 4096
+
+
+def recovery(wire_format, bursts=RECOVERY_BURSTS, seed=12345):
+    """ @return good records lost after a burst of noise, on average """
+    rng = np.random.default_rng(seed)
+    decoder = make_decoder(wire_format)
+    lost = 0
+    for _ in range(bursts):
+        before = encode_points(scatter_points(rng, RECOVERY_RECORDS), wire_format)
+        after = encode_points(scatter_points(rng, RECOVERY_RECORDS), wire_format, RECOVERY_RECORDS)
+        noise = rng.integers(0, 256, RECOVERY_BURST_BYTES, dtype=np.uint8).tobytes()
+        stream = before + noise + after
+        received = 0
+        for start in range(0, len(stream), READ_SIZE):
+            received += len(decoder.feed(stream[start:start + READ_SIZE])[0])
+        # whatever is left in the carry belongs to this burst
+        received += len(decoder.feed(b"\n")[0])
+        decoder.reset()
+        lost += max(2 * RECOVERY_RECORDS - received, 0)
+    return lost / bursts
+
+
+def run(point_count=POINT_COUNT, batch_size=BATCH_SIZE, spec=FAULT_SPEC):
+    app_instance()
+    rng = np.random.default_rng(12345)
+    batches = [scatter_points(rng, batch_size) for _ in range(point_count // batch_size)]
+    results = {}
+    for wire_format in WIRE_FORMATS:
+        faults = FaultInjector(rng=np.random.default_rng(12345))
+        faults.configure(**parse_faults(spec))
+        link = run_link(batches, wire_format, faults=faults)
+        results[f"faults_{wire_format}_points_per_sec"] = link["points_per_sec"]
+        results[f"faults_{wire_format}_latency_p95_ms"] = link["latency_p95_ms"]
+        results[f"faults_{wire_format}_lost_points"] = link["points_sent"] - link["points_delivered"]
+        results[f"faults_{wire_format}_recovery_lost_records"] = recovery(wire_format)
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>40}: {value:,.3f}")
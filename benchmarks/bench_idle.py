@@ -0,0 +1,56 @@
+"""
+Idle Benchmark
+What an open but silent connection costs: a SerialReader sits on a pty link nobody writes
+to while the main loop runs. Reads are driven by the link alone, so the reader thread
+should not wake up at all and the process should use next to no CPU.
+
+This is the reader's share only, not the whole RealTimePlotterWidget: the widget can not
+be built headless (Q3DScatter needs a real display). An idle widget also wakes the GUI
+thread for the stats refresh every STATS_REFRESH_INTERVAL ms, for the full scan refresh
+while Full Scan is on and for the watchdog while it is switched on. Those ticks and the
+graph's own redraws are not counted here.
+"""
+import time
+
+from PyQt5.QtCore import QTimer
+
+from benchmarks.common import app_instance
+from realtimeplotter.serial_reader import SerialReader
+from simulation.virtual_link import VirtualSerialLink
+
+
+IDLE_SECONDS = 2.0
+# let the port open before measuring
+SETTLE_SECONDS = 0.2
+
+
+def run(seconds=IDLE_SECONDS):
+    app = app_instance()
+    link = VirtualSerialLink()
+    reader = SerialReader(link.port_name)
+    try:
+        reader.open()
+        QTimer.singleShot(int(SETTLE_SECONDS * 1000), app.quit)
+        app.exec_()
+
+        wakeups = reader.stats.wakeups
+        started = time.perf_counter()
+        cpu = time.process_time()
+        QTimer.singleShot(int(seconds * 1000), app.quit)
+        app.exec_()
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+        wakeups = reader.stats.wakeups - wakeups
+    finally:
+        reader.stop()
+        link.close()
+    return {
+        "idle_cpu_percent": 100 * cpu / elapsed,
+        # a count over the run, a wakeups per second rate would read as higher is better
+        "idle_reader_wakeups": wakeups,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>32}: {value:,.3f}")
@@ -0,0 +1,36 @@
+"""
+Link Benchmark
+End to end through a pty link: generated points are written into the link, read and
+decoded on the reader thread and added to a scatter proxy on the main thread. Latency is
+measured from the write of a batch to the end of its proxy update.
+"""
+import numpy as np
+
+from benchmarks.common import app_instance, make_plotter
+from realtimeplotter.protocol import WIRE_FORMATS
+from simulation.plot_simulation import scatter_points
+from simulation.virtual_link import run_link
+
+
+POINT_COUNT = 100_000
+BATCH_SIZE = 1_000
+
+
+def run(point_count=POINT_COUNT, batch_size=BATCH_SIZE, with_graph=False):
+    app_instance()
+    rng = np.random.default_rng(12345)
+    batches = [scatter_points(rng, batch_size) for _ in range(point_count // batch_size)]
+    results = {}
+    for wire_format in WIRE_FORMATS:
+        plotter = make_plotter(with_graph)
+        link = run_link(batches, wire_format, sink=plotter.add_items)
+        results[f"link_{wire_format}_points_per_sec"] = link["points_per_sec"]
+        results[f"link_{wire_format}_latency_p50_ms"] = link["latency_p50_ms"]
+        results[f"link_{wire_format}_latency_p95_ms"] = link["latency_p95_ms"]
+        results[f"link_{wire_format}_lost_points"] = link["points_sent"] - link["points_delivered"]
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>32}: {value:,.3f}")
@@ -0,0 +1,99 @@
+"""
+Parse Benchmark
+Compares the per-line receive loop against the batch LineParser in lines per second.
+The LineParser is also fed a stream with LINE_ERROR_RATE of its lines damaged, good
+lines per second there should match the clean stream.
+"""
+import io
+import time
+
+import numpy as np
+
+from realtimeplotter.parsing import LineParser
+from realtimeplotter.protocol import FrameDecoder, encode_frames
+
+
+LINE_COUNT = 200_000
+READ_SIZE = 4096
+LINE_ERROR_RATE = 0.05
+
+
+def make_stream(line_count, seed=12345):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(low=-20, high=20, size=(line_count, 3))
+    return ("%d,%d,%d\r\n" * line_count % tuple(values.ravel().tolist())).encode()
+
+
+def make_faulty_stream(line_count, error_rate=LINE_ERROR_RATE, seed=12345):
+    """
+    @return the stream with error_rate of its lines garbled, cut short or given an
+    extra field, and the number of lines left intact
+    """
+    rng = np.random.default_rng(seed)
+    lines = make_stream(line_count, seed).split(b"\n")[:-1]
+    damaged = rng.choice(line_count, int(line_count * error_rate), replace=False)
+    for index in damaged:
+        line = lines[index]
+        fault = index % 3
+        if fault == 0:
+            position = rng.integers(len(line))
+            line = line[:position] + b"#" + line[position + 1:]
+        elif fault == 1:
+            line = line[:rng.integers(line.rfind(b","))]
+        else:
+            line = line[:-1] + b",1\r"
+        lines[index] = line
+    return b"\n".join(lines) + b"\n", line_count - len(damaged)
+
+
+def parse_per_line(stream):
+    """ the original receive loop, one readLine/decode/split/map per point """
+    points = []
+    serial = io.BytesIO(stream)
+    for raw_line in iter(serial.readline, b""):
+        raw_input_data = raw_line.decode()
+        x_val, y_val, z_val = map(int, raw_input_data.rstrip("\r\n").split(","))
+        points.append((x_val, z_val, y_val))
+    return points
+
+
+def parse_batched(stream, read_size=READ_SIZE):
+    """ drain the stream in serial sized reads and parse each read in one go """
+    parser = LineParser()
+    chunks = []
+    for start in range(0, len(stream), read_size):
+        chunks.append(parser.feed(stream[start:start + read_size]))
+    return np.concatenate(chunks)[:, [0, 2, 1]]
+
+
+def decode_binary(stream, read_size=READ_SIZE):
+    decoder = FrameDecoder()
+    chunks = []
+    for start in range(0, len(stream), read_size):
+        chunks.append(decoder.feed(stream[start:start + read_size])[0])
+    return np.concatenate(chunks)
+
+
+def measure(function, stream, line_count):
+    start = time.perf_counter()
+    function(stream)
+    return line_count / (time.perf_counter() - start)
+
+
+def run(line_count=LINE_COUNT):
+    stream = make_stream(line_count)
+    faulty, intact = make_faulty_stream(line_count)
+    frames = encode_frames(np.random.default_rng(12345).integers(-20, 20, (line_count, 3)))
+    return {
+        "per_line_lines_per_sec": measure(parse_per_line, stream, line_count),
+        "batched_lines_per_sec": measure(parse_batched, stream, line_count),
+        "batched_faulty_lines_per_sec": measure(parse_batched, faulty, intact),
+        "binary_frames_per_sec": measure(decode_binary, frames, line_count),
+    }
+
+
+if __name__ == "__main__":
+    results = run()
+    for name, value in results.items():
+        print(f"{name:>28}: {value:,.0f}")
+    print(f"{'speedup':>28}: {results['batched_lines_per_sec'] / results['per_line_lines_per_sec']:.1f}x")
@@ -0,0 +1,52 @@
+"""
+Plotter Benchmark
+Cost of inserting into the scatter proxy as it grows, memory per retained point in the
+point store and the proxy, and the cost of reset_graph.
+"""
+import gc
+
+import numpy as np
+
+from benchmarks.common import app_instance, make_plotter, rss_bytes, timed
+from realtimeplotter.point_store import PointStore
+
+
+SIZES = (1_000, 10_000, 100_000)
+BATCH_SIZE = 1_000
+MEMORY_POINTS = 200_000
+
+
+def insertion_cost(size, with_graph=False):
+    """ microseconds per point for the batches that grow the proxy from 0 to size """
+    plotter = make_plotter(with_graph)
+    points = np.random.default_rng(size).uniform(-20, 20, (size, 3))
+    seconds = 0.0
+    for start in range(0, size, BATCH_SIZE):
+        seconds += timed(plotter.add_items, points[start:start + BATCH_SIZE])
+    return seconds / size * 1e6, plotter
+
+
+def run(sizes=SIZES, with_graph=False):
+    app_instance()
+    results = {}
+    for size in sizes:
+        cost, plotter = insertion_cost(size, with_graph)
+        results[f"insert_us_per_point_{size}"] = cost
+        results[f"reset_graph_ms_{size}"] = timed(plotter.reset_graph) * 1000
+        del plotter
+        gc.collect()
+
+    store = PointStore(MEMORY_POINTS)
+    results["store_bytes_per_point"] = store.nbytes / store.capacity
+
+    before = rss_bytes()
+    _, plotter = insertion_cost(MEMORY_POINTS, with_graph)
+    after = rss_bytes()
+    if before is not None:
+        results["proxy_bytes_per_point"] = (after - before) / MEMORY_POINTS
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>32}: {value:,.3f}")
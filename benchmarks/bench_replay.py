@@ -0,0 +1,70 @@
+"""
+Replay Benchmark
+Records a synthetic LIDAR session to a temporary directory, then replays it headless
+through the production ingest path: spherical transform, point store and a display
+budgeted proxy. Opening the session should not depend on its size, the memory map only
+reads the chunk headers.
+"""
+import tempfile
+import time
+
+from benchmarks.common import app_instance, make_plotter
+from realtimeplotter.point_store import PointStore
+from realtimeplotter.recorder import SessionRecorder
+from realtimeplotter.replay import SessionReplay, REPLAY_MAX_SPEED
+from realtimeplotter.transform import SphericalTransform
+from simulation.scene import LidarScene
+
+
+READ_SIZE = 1_000
+DISPLAY_MAX_POINTS = 50_000
+
+
+def record_session(directory):
+    recorder = SessionRecorder(directory, fsync_interval=None)
+    recorder.start()
+    sequence = 0
+    for chunk in LidarScene().sweep():
+        # split the sweep into reads of the size a busy serial link delivers
+        for start in range(0, len(chunk), READ_SIZE):
+            values = chunk[start:start + READ_SIZE]
+            recorder.write(values, range(sequence, sequence + len(values)), float(sequence))
+            sequence += len(values)
+    recorder.stop()
+    return recorder.records_written
+
+
+def run(with_graph=False):
+    app_instance()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        records = record_session(directory)
+
+        start = time.perf_counter()
+        replay = SessionReplay(directory, REPLAY_MAX_SPEED)
+        results["replay_open_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in replay.batches():
+            pass
+        results["replay_read_points_per_sec"] = records / (time.perf_counter() - start)
+
+        transform = SphericalTransform()
+        store = PointStore(records)
+        plotter = make_plotter(with_graph, max_points=DISPLAY_MAX_POINTS)
+
+        def receive_production(raw, sequence, timestamp):
+            points = transform.to_cartesian(raw)
+            store.append(points, raw, timestamp, sequence)
+            plotter.add_items(points[:, [0, 2, 1]])
+
+        start = time.perf_counter()
+        replay.run(receive_production)
+        results["replay_pipeline_points_per_sec"] = records / (time.perf_counter() - start)
+        del replay
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>32}: {value:,.3f}")
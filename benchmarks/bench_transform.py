@@ -0,0 +1,63 @@
+"""
+Transform Benchmark
+Compares the per-point math.radians/sin/cos conversion of receive_production with the
+table driven SphericalTransform in points per second.
+"""
+import math
+import time
+
+import numpy as np
+
+from realtimeplotter.transform import SphericalTransform
+
+
+POINT_COUNT = 500_000
+
+
+def make_samples(point_count, seed=12345):
+    rng = np.random.default_rng(seed)
+    samples = np.empty((point_count, 3))
+    samples[:, 0] = rng.integers(30, 160, point_count)
+    samples[:, 1] = rng.integers(-60, 60, point_count)
+    samples[:, 2] = rng.integers(100, 4000, point_count)
+    return samples
+
+
+def transform_per_point(samples):
+    points = []
+    for azimuth, elevation, distance in samples.tolist():
+        phi = math.radians(azimuth)
+        theta = math.radians(elevation)
+        points.append(
+            (
+                distance * math.sin(theta) * math.cos(phi),
+                distance * math.sin(theta) * math.sin(phi),
+                distance * math.cos(theta),
+            )
+        )
+    return points
+
+
+def transform_batched(samples):
+    return SphericalTransform().to_cartesian(samples)
+
+
+def measure(function, samples):
+    start = time.perf_counter()
+    function(samples)
+    return len(samples) / (time.perf_counter() - start)
+
+
+def run(point_count=POINT_COUNT):
+    samples = make_samples(point_count)
+    return {
+        "per_point_points_per_sec": measure(transform_per_point, samples),
+        "batched_points_per_sec": measure(transform_batched, samples),
+    }
+
+
+if __name__ == "__main__":
+    results = run()
+    for name, value in results.items():
+        print(f"{name:>28}: {value:,.0f}")
+    print(f"{'speedup':>28}: {results['batched_points_per_sec'] / results['per_point_points_per_sec']:.1f}x")
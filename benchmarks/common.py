@@ -0,0 +1,41 @@
+"""
+Common
+Shared helpers for the benchmarks.
+"""
+import os
+import time
+
+from PyQt5.QtDataVisualization import QScatter3DSeries
+
+from realtimeplotter.plotter import Plotter
+
+
+def app_instance():
+    """ the running QApplication, created offscreen when there is none """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def make_plotter(with_graph=False, **budget):
+    """
+    Without the graph the Plotter fills a bare series. The series and proxy work without
+    an OpenGL context, so everything but the final draw is still measured.
+    """
+    return Plotter(**budget) if with_graph else Plotter(series=QScatter3DSeries(), **budget)
+
+
+def rss_bytes():
+    """ resident set size of this process, None where /proc is not available """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
@@ -1,7 +1,6 @@
 """
 CustomScanWidget
 """
-from PyQt5 import QtSerialPort
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
@@ -48,6 +47,16 @@ SAMPLES_PER_LOW = 3
 SAMPLES_PER_HIGH = 10
 SAMPLES_PER_STEP = 1
 
+"""
+Azimuth, elevation and distance a scan can report, anything else on the production
+stream is a corrupted record, see SerialReader limits
+"""
+SCAN_LIMITS = (
+    (AZIMUTH_MIN_LOW, AZIMUTH_MAX_HIGH),
+    (ELEVATE_MIN_LOW, ELEVATE_MAX_HIGH),
+    (0, float("inf")),
+)
+
 """
 Widget Size
 """
@@ -83,15 +92,14 @@ class CustomScanWidget(QWidget):
     Constructor
     """
 
-    def __init__(self, parent=None):
+    def __init__(self, reader, parent=None):
         super(CustomScanWidget, self).__init__(parent)
 
         """
-        Serial Connection
+        Connection, the plotter's SerialReader, the scan command goes out on the
+        board's own connection like every other command
         """
-        self.serial = QtSerialPort.QSerialPort(
-            "COM4", baudRate=QtSerialPort.QSerialPort.Baud9600
-        )
+        self.reader = reader
 
         """
         Buttons
@@ -381,6 +389,6 @@ class CustomScanWidget(QWidget):
         t_g = self.lcd_samples_orientation.value()
         t_h = self.lcd_scan_frequency.value()
         temp_string = f"-a={t_a},{t_b}-e={t_c},{t_d}-s{t_f}."
-        self.serial.write(temp_string.encode())
+        self.reader.write(temp_string.encode())
         self.finish_setting_values.setAttribute(Qt.WA_DeleteOnClose)
         self.close()
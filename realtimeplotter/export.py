@@ -0,0 +1,141 @@
+"""
+Export
+Streaming binary PLY and PCD writers for the point cloud.
+
+The header only needs the point count, so the points are written straight from a store
+one window at a time (store.iter_xyz()) as float32 x, y, z. Each window is a single
+write of its bytes, nothing is formatted per point and peak memory is one window, not
+a second copy of the cloud. Coordinates are the store's cartesian x, y, z, not the
+swapped axes of the graph.
+
+StoreExport runs export_store() on a background thread so the GUI keeps drawing and
+reading while a large store is written out.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from realtimeplotter.point_store import PointStore
+
+
+EXPORT_PLY = "ply"
+EXPORT_PCD = "pcd"
+EXPORT_FORMATS = (EXPORT_PLY, EXPORT_PCD)
+
+XYZ_DTYPE = np.dtype("<f4")
+
+
+def ply_header(count):
+    return (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {count}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        "end_header\n"
+    ).encode("ascii")
+
+
+def pcd_header(count):
+    return (
+        "# .PCD v0.7 - Point Cloud Data file format\n"
+        "VERSION 0.7\n"
+        "FIELDS x y z\n"
+        "SIZE 4 4 4\n"
+        "TYPE F F F\n"
+        "COUNT 1 1 1\n"
+        f"WIDTH {count}\n"
+        "HEIGHT 1\n"
+        "VIEWPOINT 0 0 0 1 0 0 0\n"
+        f"POINTS {count}\n"
+        "DATA binary\n"
+    ).encode("ascii")
+
+
+HEADERS = {EXPORT_PLY: ply_header, EXPORT_PCD: pcd_header}
+
+
+def write_points(path, windows, count, export_format):
+    """
+    @param windows iterable of (N, 3) arrays holding count points in total
+    @return points written
+    """
+    written = 0
+    with open(path, "wb") as output:
+        output.write(HEADERS[export_format](count))
+        for window in windows:
+            window = np.ascontiguousarray(window, dtype=XYZ_DTYPE)
+            window = window[:count - written]
+            output.write(memoryview(window).cast("B"))
+            written += len(window)
+    if written != count:
+        raise ValueError(f"expected {count} points, got {written}")
+    return written
+
+
+def export_format_of(path):
+    export_format = os.path.splitext(path)[1].lstrip(".").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {export_format!r}, use one of {EXPORT_FORMATS}")
+    return export_format
+
+
+def export_store(path, store, export_format=None):
+    """
+    Write every point of a PointStore or MappedPointStore, the format follows the file
+    extension unless given. @return points written
+    """
+    return write_points(path, store.iter_xyz(), len(store), export_format or export_format_of(path))
+
+
+def export_points(path, points, export_format=None):
+    """ write an (N, 3) array """
+    return write_points(path, [points], len(points), export_format or export_format_of(path))
+
+
+class StoreExport:
+    """
+    export_store() on a background thread, started with start() and polled with
+    is_running(). count, seconds and error are set once it is done.
+
+    A PointStore overwrites its oldest records while the thread reads, so its positions
+    are copied when the export is created. A MappedPointStore is append only and the
+    points it holds at that moment are read in place.
+    """
+
+    def __init__(self, path, store, export_format=None):
+        self.path = path
+        self.export_format = export_format or export_format_of(path)
+        self.total = len(store)
+        if isinstance(store, PointStore):
+            self.windows = [segment["position"].copy() for segment in store.segments()]
+        else:
+            self.windows = store.iter_xyz()
+        self.thread = None
+        self.count = 0
+        self.seconds = 0.0
+        self.error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="store-export")
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self.count = write_points(self.path, self.windows, self.total, self.export_format)
+        except (OSError, ValueError) as error:
+            self.error = error
+        finally:
+            self.windows = None
+            self.seconds = time.perf_counter() - started
@@ -0,0 +1,374 @@
+"""
+LevelOfDetail
+Voxel grid decimation of the point store for the full scan view, one representative per
+occupied voxel, the voxel size following the camera zoom.
+"""
+import threading
+
+import numpy as np
+
+from realtimeplotter.point_store import PointStore, WINDOW_POINTS
+
+
+LOD_RENDER_BUDGET = 100_000
+LOD_REFERENCE_ZOOM = 150.0
+LOD_GROWTH = 1.5
+LOD_BLOCK_POINTS = 1 << 18
+
+CENTROID = "centroid"
+FIRST_HIT = "first"
+
+
+def _group(cells):
+    """
+    @param cells (N, 3) integer voxel coordinates
+    @return the index of the first row of every distinct cell, in order of appearance,
+        and the group every row belongs to
+    """
+    cells = cells - cells.min(axis=0)
+    dims = cells.max(axis=0) + 1
+    if np.prod(dims.astype(float)) < 2 ** 62:
+        keys = np.ravel_multi_index(cells.T, dims)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(cells, axis=0, return_index=True, return_inverse=True)
+
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+def voxel_downsample(points, voxel_size, mode=CENTROID):
+    """
+    One representative per occupied voxel.
+    @param points (N, 3) array
+    @param voxel_size edge length of a voxel in the units of points
+    @param mode CENTROID or FIRST_HIT
+    @return (M, 3) array, M <= N
+    """
+    if not len(points):
+        return points
+    first, inverse = _group(np.floor(points / voxel_size).astype(np.int64))
+
+    if mode == FIRST_HIT:
+        return points[first]
+    if mode != CENTROID:
+        raise ValueError(f"unknown lod mode {mode!r}")
+
+    counts = np.bincount(inverse)
+    return np.column_stack(
+        [np.bincount(inverse, weights=points[:, axis]) / counts for axis in range(3)]
+    )
+
+
+class VoxelGrid:
+    """
+    Running voxel_downsample(). Points are folded in batch by batch and every occupied
+    voxel keeps the sum and count of its points and its first point, so the result is
+    the same as reducing all of them at once.
+    """
+
+    def __init__(self, voxel_size, mode=CENTROID):
+        if mode not in (CENTROID, FIRST_HIT):
+            raise ValueError(f"unknown lod mode {mode!r}")
+        self.voxel_size = voxel_size
+        self.mode = mode
+        self.cells = np.empty((0, 3), dtype=np.int64)
+        self.sums = np.empty((0, 3))
+        self.counts = np.empty(0)
+        self.firsts = np.empty((0, 3))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def fold(self, points):
+        if not len(points):
+            return
+        points = np.asarray(points, dtype=np.float64)
+        # cells are anchored at the origin, so voxels folded in at different times line up
+        self._regroup(
+            np.concatenate((self.cells, np.floor(points / self.voxel_size).astype(np.int64))),
+            np.concatenate((self.sums, points)),
+            np.concatenate((self.counts, np.ones(len(points)))),
+            np.concatenate((self.firsts, points)),
+        )
+
+    def coarsen(self, voxel_size):
+        """ regroup the occupied voxels by their representatives into voxels of voxel_size """
+        cells = np.floor(self.points() / voxel_size).astype(np.int64)
+        self.voxel_size = voxel_size
+        self._regroup(cells, self.sums, self.counts, self.firsts)
+
+    def _regroup(self, cells, sums, counts, firsts):
+        first, inverse = _group(cells)
+        self.cells = cells[first]
+        self.firsts = firsts[first]
+        self.counts = np.bincount(inverse, weights=counts)
+        self.sums = np.column_stack(
+            [np.bincount(inverse, weights=sums[:, axis]) for axis in range(3)]
+        )
+
+    def points(self):
+        """ (M, 3) one representative per occupied voxel """
+        if self.mode == FIRST_HIT:
+            return self.firsts
+        return self.sums / self.counts[:, None]
+
+
+def merge_grids(grids, voxel_size, mode=CENTROID):
+    """ one VoxelGrid holding everything in grids, which all use voxel_size """
+    merged = VoxelGrid(voxel_size, mode)
+    grids = [grid for grid in grids if len(grid)]
+    if grids:
+        merged._regroup(
+            np.concatenate([grid.cells for grid in grids]),
+            np.concatenate([grid.sums for grid in grids]),
+            np.concatenate([grid.counts for grid in grids]),
+            np.concatenate([grid.firsts for grid in grids]),
+        )
+    return merged
+
+
+def store_rows(store):
+    """
+    @return the first and the end row a store holds, counted from the first point ever
+    appended, a PointStore that overwrote its oldest points starts past 0
+    """
+    first = getattr(store, "overwritten", 0)
+    return first, first + len(store)
+
+
+class BlockedGrid:
+    """
+    A VoxelGrid per block of block_points rows of a store, rows counted as in
+    store_rows(). A ring buffer overwriting its oldest points only costs dropping the
+    blocks it has overwritten completely, the points it overwrote of the oldest block
+    left stay on display until the rest of that block goes as well.
+    """
+
+    def __init__(self, voxel_size, mode=CENTROID, block_points=LOD_BLOCK_POINTS):
+        self.voxel_size = voxel_size
+        self.mode = mode
+        self.block_points = block_points
+        self.blocks = {}
+        # row after the last one folded in
+        self.end = 0
+        # every block but the newest merged, they only change when blocks come or go
+        self.closed = None
+
+    def fold(self, points, start):
+        """ fold in points, which are rows start on """
+        done = 0
+        while done < len(points):
+            number = (start + done) // self.block_points
+            stop = min(len(points), (number + 1) * self.block_points - start)
+            if number not in self.blocks:
+                self.blocks[number] = VoxelGrid(self.voxel_size, self.mode)
+                self.closed = None
+            self.blocks[number].fold(points[done:stop])
+            done = stop
+        self.end = max(self.end, start + len(points))
+
+    def expire(self, first):
+        """ drop the blocks that only hold rows before first """
+        for number in [number for number in self.blocks if (number + 1) * self.block_points <= first]:
+            del self.blocks[number]
+            self.closed = None
+
+    def coarsen(self, voxel_size):
+        self.voxel_size = voxel_size
+        for grid in self.blocks.values():
+            grid.coarsen(voxel_size)
+        self.closed = None
+
+    def merged(self):
+        """ VoxelGrid of every block """
+        numbers = sorted(self.blocks)
+        if not numbers:
+            return VoxelGrid(self.voxel_size, self.mode)
+        if self.closed is None:
+            self.closed = merge_grids([self.blocks[number] for number in numbers[:-1]], self.voxel_size, self.mode)
+        return merge_grids([self.closed, self.blocks[numbers[-1]]], self.voxel_size, self.mode)
+
+
+class GridRebuild:
+    """
+    Builds the BlockedGrid of a whole store on a background thread, started with
+    start() and polled with is_running(), see LevelOfDetail.rebuild(). grid, scale and
+    error are set once it is done.
+
+    A PointStore is copied when the rebuild is created since its oldest records are
+    overwritten while the thread reads, a MappedPointStore is append only and the points
+    it holds at that moment are read in place.
+    """
+
+    def __init__(self, store, zoom, render_budget=LOD_RENDER_BUDGET, mode=CENTROID, scale=1.0):
+        self.zoom = zoom
+        self.render_budget = render_budget
+        self.mode = mode
+        self.scale = scale
+        self.first, self.end = store_rows(store)
+        if isinstance(store, PointStore):
+            self.copies = [segment["position"].copy() for segment in store.segments()]
+        else:
+            self.copies = None
+            self.store = store
+        self.thread = None
+        self.grid = None
+        self.error = None
+
+    def windows(self):
+        if self.copies is not None:
+            for copy in self.copies:
+                for start in range(0, len(copy), WINDOW_POINTS):
+                    yield copy[start:start + WINDOW_POINTS]
+            return
+        size = self.end - self.first
+        for start in range(0, size, WINDOW_POINTS):
+            yield self.store.window(start, min(start + WINDOW_POINTS, size))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="lod-rebuild")
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        try:
+            self.grid = self.build()
+        except (OSError, ValueError) as error:
+            self.error = error
+        finally:
+            self.copies = None
+            self.store = None
+
+    def build(self):
+        lower = np.full(3, np.inf)
+        upper = np.full(3, -np.inf)
+        for window in self.windows():
+            lower = np.minimum(lower, window.min(axis=0))
+            upper = np.maximum(upper, window.max(axis=0))
+        extent = float((upper - lower).max()) or 1.0
+        base = extent / self.render_budget ** (1 / 3) * LOD_REFERENCE_ZOOM / self.zoom
+
+        grid = BlockedGrid(base * self.scale, self.mode)
+        start = self.first
+        reduced = grid.merged()
+        for window in self.windows():
+            grid.fold(window, start)
+            start += len(window)
+            reduced = grid.merged()
+            while len(reduced) > self.render_budget:
+                self.scale *= LOD_GROWTH
+                grid.coarsen(grid.voxel_size * LOD_GROWTH)
+                reduced = grid.merged()
+        grid.end = self.end
+
+        # let the voxels shrink back on the next rebuild once the zoom allows it
+        if len(reduced) < self.render_budget / LOD_GROWTH ** 3:
+            self.scale = max(1.0, self.scale / LOD_GROWTH)
+        return grid
+
+
+class LevelOfDetail:
+    """
+    Reduces a cloud to at most render_budget points for the current zoom level.
+
+    The starting voxel edge splits the bounding box into roughly render_budget cells at
+    the reference zoom and is scaled by the zoom. It is grown until the result fits the
+    budget and the size that worked is remembered for the next call.
+    """
+
+    def __init__(self, render_budget=LOD_RENDER_BUDGET, mode=CENTROID):
+        self.render_budget = render_budget
+        self.mode = mode
+        self.scale = 1.0
+        self.voxel_size = None
+        # reduce_store() state, a BlockedGrid of the store at zoom
+        self.grid = None
+        self.zoom = None
+
+    def reduce(self, points, zoom=LOD_REFERENCE_ZOOM):
+        if len(points) <= self.render_budget:
+            self.voxel_size = None
+            return points
+
+        extent = float(np.ptp(points, axis=0).max()) or 1.0
+        return self._fit(extent, zoom, lambda voxel_size: voxel_downsample(points, voxel_size, self.mode))
+
+    def reduce_store(self, store, zoom=LOD_REFERENCE_ZOOM):
+        """
+        reduce() for everything in a PointStore or MappedPointStore, rebuilding the grid
+        right here when it has to be. The GUI starts rebuild() on a thread instead and
+        calls update() once it has adopt()ed the result.
+        """
+        if self.needs_rebuild(store, zoom):
+            rebuild = self.rebuild(store, zoom)
+            rebuild.run()
+            if rebuild.error is not None:
+                raise rebuild.error
+            self.adopt(rebuild)
+        return self.update(store)
+
+    def needs_rebuild(self, store, zoom):
+        """
+        Whether the whole store has to be read again, because the zoom changed or the
+        store shrank, a small store is not reduced at all
+        """
+        if len(store) <= self.render_budget:
+            return False
+        return self.grid is None or zoom != self.zoom or store_rows(store)[1] < self.grid.end
+
+    def rebuild(self, store, zoom):
+        """ @return a GridRebuild of store at zoom, not started yet """
+        return GridRebuild(store, zoom, self.render_budget, self.mode, self.scale)
+
+    def adopt(self, rebuild):
+        self.grid = rebuild.grid
+        self.zoom = rebuild.zoom
+        self.scale = rebuild.scale
+
+    def update(self, store):
+        """
+        The reduced store from the current grid, only the points appended since the last
+        call or the rebuild are read. @return (N, 3) array
+        """
+        if len(store) <= self.render_budget or self.grid is None:
+            self.voxel_size = None
+            windows = list(store.iter_xyz()) if len(store) <= self.render_budget else []
+            return np.concatenate(windows) if windows else np.empty((0, 3), dtype=np.float32)
+
+        first, end = store_rows(store)
+        self.grid.expire(first)
+        start = max(self.grid.end, first)
+        reduced = self.grid.merged()
+        for window in store.iter_xyz(start=start - first):
+            self.grid.fold(window, start)
+            start += len(window)
+            reduced = self.grid.merged()
+            while len(reduced) > self.render_budget:
+                self.scale *= LOD_GROWTH
+                self.grid.coarsen(self.grid.voxel_size * LOD_GROWTH)
+                reduced = self.grid.merged()
+        self.voxel_size = self.grid.voxel_size
+        return reduced.points()
+
+    def _fit(self, extent, zoom, downsample):
+        base = extent / self.render_budget ** (1 / 3) * LOD_REFERENCE_ZOOM / zoom
+        while True:
+            self.voxel_size = base * self.scale
+            reduced = downsample(self.voxel_size)
+            if len(reduced) <= self.render_budget:
+                break
+            self.scale *= LOD_GROWTH
+
+        # let the voxels shrink back once the cloud or the zoom allow it
+        if len(reduced) < self.render_budget / LOD_GROWTH ** 3:
+            self.scale = max(1.0, self.scale / LOD_GROWTH)
+        return reduced
@@ -0,0 +1,88 @@
+"""
+LogConsole
+Bounded, batched replacement for the QTextEdit used to echo raw data.
+
+Lines are queued and written to a QPlainTextEdit once per UI tick with a single append.
+The document keeps at most max_lines blocks, older ones are dropped by Qt. Under heavy
+load only every Nth data line is shown and whatever does not fit in a tick is collapsed
+into a summary line.
+"""
+from PyQt5.QtCore import QTimer, pyqtSlot
+from PyQt5.QtWidgets import QPlainTextEdit
+
+
+LOG_MAX_LINES = 2000
+LOG_FLUSH_INTERVAL = 100
+LOG_LINES_PER_TICK = 200
+
+
+class LogConsole(QPlainTextEdit):
+    """
+    append() queues a message that is always shown.
+    append_points() queues an (N, 3) array that is only formatted, and sampled, when the
+    console is flushed.
+    """
+
+    def __init__(
+        self,
+        max_lines=LOG_MAX_LINES,
+        lines_per_tick=LOG_LINES_PER_TICK,
+        sample_every=1,
+        parent=None,
+    ):
+        super(LogConsole, self).__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_lines)
+        self.lines_per_tick = lines_per_tick
+        self.sample_every = sample_every
+        self.sample_phase = 0
+        self.pending = []
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(LOG_FLUSH_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+
+    def set_sample_every(self, sample_every):
+        self.sample_every = max(1, sample_every)
+        self.sample_phase = 0
+
+    def append(self, text):
+        self._queue(str(text))
+
+    def append_points(self, points, template="({:.0f}, {:.0f}, {:.0f})"):
+        """
+        @param points (N, 3) array
+        @param template str.format template for one row
+        """
+        if len(points):
+            self._queue((points, template))
+
+    def _queue(self, entry):
+        self.pending.append(entry)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @pyqtSlot()
+    def flush(self):
+        lines = []
+        hidden = 0
+        for entry in self.pending:
+            if isinstance(entry, str):
+                lines.append(entry)
+                continue
+
+            points, template = entry
+            first = -self.sample_phase % self.sample_every
+            self.sample_phase = (self.sample_phase + len(points)) % self.sample_every
+            rows = points[first::self.sample_every]
+            room = max(0, self.lines_per_tick - len(lines))
+            hidden += len(points) - min(len(rows), room)
+            lines.extend(template.format(*row) for row in rows[:room].tolist())
+
+        self.pending = []
+        if hidden:
+            lines.append(f"[{hidden} lines not shown]")
+        if lines:
+            self.appendPlainText("\n".join(lines))
@@ -0,0 +1,154 @@
+"""
+MappedPointStore
+On disk point store for sessions larger than RAM.
+
+Points are kept column by column in memory mapped segment files of segment_points points
+each, a new segment is added whenever the last one is full, nothing is ever overwritten.
+Only the pages being written or read are resident, the OS writes the rest back and drops
+it under memory pressure. Readers take windows of the x, y, z columns (window(),
+iter_xyz()) so the renderer and analysis tools never load the whole cloud.
+
+A segment file holds one block per column, each segment_points long:
+
+    x, y, z     float32 cartesian coordinates
+    raw0..raw2  float32 values as received (azimuth, elevation, range in production)
+    timestamp   float64 host time the point was read
+    sequence    int64 sequence number from the decoder
+
+store.json next to the segments keeps the segment size and the number of points, it is
+written by flush() and close() so a store can be opened again for analysis.
+"""
+import json
+import os
+
+import numpy as np
+
+
+SEGMENT_POINTS = 1 << 20
+WINDOW_POINTS = 1 << 18
+COLUMNS = (
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("raw0", "<f4"),
+    ("raw1", "<f4"),
+    ("raw2", "<f4"),
+    ("timestamp", "<f8"),
+    ("sequence", "<i8"),
+)
+SEGMENT_NAME = "segment-{:05d}.pts"
+STORE_INDEX = "store.json"
+
+
+def segment_dtype(segment_points):
+    return np.dtype([(name, dtype, (segment_points,)) for name, dtype in COLUMNS])
+
+
+class MappedPointStore:
+    """
+    Append only columnar store in directory, reopened when the directory already has one.
+    Takes the same append() arguments as PointStore.
+    """
+
+    def __init__(self, directory, segment_points=SEGMENT_POINTS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.size = 0
+        index = os.path.join(directory, STORE_INDEX)
+        if os.path.exists(index):
+            with open(index) as stored:
+                stored = json.load(stored)
+            segment_points = stored["segment_points"]
+            self.size = stored["size"]
+        self.segment_points = segment_points
+        self.dtype = segment_dtype(segment_points)
+        self.segments = []
+        while len(self.segments) * segment_points < self.size:
+            self.segments.append(self._map(len(self.segments), "r+"))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """ bytes on disk, whole segments """
+        return len(self.segments) * self.dtype.itemsize
+
+    def _map(self, number, mode):
+        path = os.path.join(self.directory, SEGMENT_NAME.format(number))
+        return np.memmap(path, dtype=self.dtype, mode=mode, shape=())
+
+    def clear(self):
+        self.segments = []
+        self.size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".pts"):
+                os.remove(os.path.join(self.directory, name))
+        self.flush()
+
+    def append(self, position, raw=None, timestamp=0.0, sequence=0):
+        """
+        Store a batch of points, returns how many were kept (always all of them).
+        @param position (N, 3) cartesian coordinates
+        @param raw (N, 3) values as received, defaults to position
+        @param timestamp scalar or (N,) host times
+        @param sequence scalar or (N,) sequence numbers
+        """
+        position = np.asarray(position)
+        raw = position if raw is None else np.asarray(raw)
+        timestamp = np.broadcast_to(timestamp, len(position))
+        sequence = np.broadcast_to(sequence, len(position))
+        done = 0
+        while done < len(position):
+            number, offset = divmod(self.size, self.segment_points)
+            if number == len(self.segments):
+                self.segments.append(self._map(number, "w+"))
+            segment = self.segments[number]
+            count = min(len(position) - done, self.segment_points - offset)
+            rows = slice(done, done + count)
+            stop = offset + count
+            for axis, name in enumerate(("x", "y", "z")):
+                segment[name][offset:stop] = position[rows, axis]
+            for axis in range(3):
+                segment[f"raw{axis}"][offset:stop] = raw[rows, axis]
+            segment["timestamp"][offset:stop] = timestamp[rows]
+            segment["sequence"][offset:stop] = sequence[rows]
+            self.size += count
+            done += count
+        return len(position)
+
+    def column(self, name, start=0, stop=None):
+        """ a copy of one column for points start to stop """
+        stop = self.size if stop is None else min(stop, self.size)
+        parts = []
+        while start < stop:
+            number, offset = divmod(start, self.segment_points)
+            count = min(stop - start, self.segment_points - offset)
+            parts.append(self.segments[number][name][offset:offset + count])
+            start += count
+        if not parts:
+            return np.empty(0, dtype=dict(COLUMNS)[name])
+        return np.concatenate(parts)
+
+    def window(self, start=0, stop=None):
+        """ (N, 3) float32 x, y, z of points start to stop, only that window is read """
+        stop = self.size if stop is None else min(stop, self.size)
+        xyz = np.empty((max(stop - start, 0), 3), dtype=np.float32)
+        for axis, name in enumerate(("x", "y", "z")):
+            xyz[:, axis] = self.column(name, start, stop)
+        return xyz
+
+    def iter_xyz(self, window=WINDOW_POINTS, start=0):
+        """ points start on as consecutive (N, 3) windows of at most window points, oldest first """
+        for offset in range(start, self.size, window):
+            yield self.window(offset, offset + window)
+
+    def flush(self):
+        for segment in self.segments:
+            segment.flush()
+        with open(os.path.join(self.directory, STORE_INDEX), "w") as index:
+            json.dump({"segment_points": self.segment_points, "size": self.size}, index)
+
+    def close(self):
+        self.flush()
+        self.segments = []
@@ -0,0 +1,183 @@
+"""
+Parsing
+Batch parsers that turn the "a,b,c\\r\\n" lines read from the serial connection into
+NumPy arrays, everything available in a read at once.
+"""
+import numpy as np
+
+
+LINE_TERMINATOR = b"\n"
+FIELD_SEPARATOR = b","
+FIELDS_PER_LINE = 3
+# longer lines are rejected, "-32768,-32768,-32768\r" is 21 bytes
+MAX_LINE_LENGTH = 64
+
+CLASS_DIGIT = 0
+CLASS_MINUS = 1
+CLASS_COMMA = 2
+CLASS_CR = 3
+CLASS_LF = 4
+CLASS_OTHER = 5
+CLASS_COUNT = 6
+
+# the classes a byte of each class may follow within a well formed line, CLASS_LF
+# standing in for the start of the line
+FOLLOWS = {
+    CLASS_DIGIT: (CLASS_DIGIT, CLASS_MINUS, CLASS_COMMA, CLASS_LF),
+    CLASS_MINUS: (CLASS_COMMA, CLASS_LF),
+    CLASS_COMMA: (CLASS_DIGIT,),
+    CLASS_CR: (CLASS_DIGIT,),
+    CLASS_LF: (CLASS_DIGIT, CLASS_CR),
+    CLASS_OTHER: (),
+}
+# any pair weighs more than the two commas a good line adds up to
+BAD_PAIR = 3
+
+
+def _byte_classes():
+    classes = np.full(256, CLASS_OTHER, dtype=np.uint8)
+    classes[ord("0"):ord("9") + 1] = CLASS_DIGIT
+    classes[ord("-")] = CLASS_MINUS
+    classes[ord(",")] = CLASS_COMMA
+    classes[ord("\r")] = CLASS_CR
+    classes[ord("\n")] = CLASS_LF
+    return classes
+
+
+def _pair_tables():
+    """
+    Indexed by previous class * CLASS_COUNT + class.
+    @return the weight of every pair and whether it ends a field
+    """
+    weight = np.zeros(CLASS_COUNT * CLASS_COUNT, dtype=np.uint8)
+    field_end = np.zeros(CLASS_COUNT * CLASS_COUNT, dtype=bool)
+    for current, previous_classes in FOLLOWS.items():
+        for previous in range(CLASS_COUNT):
+            pair = previous * CLASS_COUNT + current
+            if previous not in previous_classes:
+                weight[pair] = BAD_PAIR
+            elif current == CLASS_COMMA:
+                weight[pair] = 1
+            field_end[pair] = previous == CLASS_DIGIT and current in (CLASS_COMMA, CLASS_CR, CLASS_LF)
+    return weight, field_end
+
+
+BYTE_CLASS = _byte_classes()
+PAIR_WEIGHT, PAIR_FIELD_END = _pair_tables()
+
+
+class LineParser:
+    """
+    Incremental parser for newline terminated "a,b,c" records.
+
+    feed() accepts any number of bytes and returns an (N, 3) float64 array holding
+    every complete line received so far. Bytes after the last line terminator are
+    carried over to the next call, lines that can not be read, or fall outside limits,
+    are counted in rejected. feed() never raises on bad data.
+
+    @param limits optional ((low, high), ...) per field, inclusive
+    """
+
+    def __init__(self, limits=None):
+        self.limits = None if limits is None else np.asarray(limits, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self.carry = b""
+        self.discarding = False
+        self.rejected = 0
+
+    def feed(self, data):
+        buffer = self.carry + bytes(data)
+        if self.discarding:
+            # the rest of a line already too long to be good
+            start = buffer.find(LINE_TERMINATOR)
+            if start < 0:
+                self.carry = b""
+                return np.empty((0, FIELDS_PER_LINE))
+            buffer = buffer[start + 1:]
+            self.discarding = False
+
+        end = buffer.rfind(LINE_TERMINATOR)
+        if end < 0:
+            values = np.empty((0, FIELDS_PER_LINE))
+            self.carry = buffer
+        else:
+            self.carry = buffer[end + 1:]
+            block = buffer[:end + 1]
+            values = parse_lines(block, self.limits)
+            self.rejected += block.count(LINE_TERMINATOR) - len(values)
+
+        # noise without line terminators would otherwise pile up in the carry
+        if len(self.carry) > MAX_LINE_LENGTH:
+            self.carry = b""
+            self.discarding = True
+            self.rejected += 1
+        return values
+
+
+def parse_lines(block, limits=None):
+    """
+    Parse a block of complete lines into an (N, 3) array.
+    Lines that are not three integers, or fall outside limits, are left out.
+    """
+    # every byte is classed and every pair of neighbouring bytes weighed, which settles
+    # for all lines at once whether each is three integers, a block with bad lines takes
+    # the same steps as a clean one and never falls back to parsing line by line
+    data = np.frombuffer(block, dtype=np.uint8)
+    classes = BYTE_CLASS.take(data)
+    pairs = np.empty_like(classes)
+    pairs[0] = CLASS_LF * CLASS_COUNT + classes[0]
+    np.multiply(classes[:-1], CLASS_COUNT, out=pairs[1:])
+    pairs[1:] += classes[1:]
+
+    ends = np.flatnonzero(classes == CLASS_LF)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    # a sum over a line longer than MAX_LINE_LENGTH may wrap, those lines go anyway
+    valid = np.add.reduceat(PAIR_WEIGHT.take(pairs), starts) == FIELDS_PER_LINE - 1
+    valid &= lengths < MAX_LINE_LENGTH
+
+    field_ends = PAIR_FIELD_END.take(pairs)
+    minus = classes == CLASS_MINUS
+    if not valid.all():
+        keep = np.repeat(valid, lengths + 1)
+        field_ends &= keep
+        minus &= keep
+    field_ends = np.flatnonzero(field_ends)
+    values = read_integers(data, field_ends, np.flatnonzero(minus)).reshape(-1, FIELDS_PER_LINE)
+    if limits is not None:
+        values = values[within_limits(values, limits)]
+    return values
+
+
+def read_integers(data, field_ends, minus):
+    """
+    @param data uint8 bytes ending in a line terminator
+    @param field_ends index of the byte after the last digit of every field
+    @param minus index of every minus sign in front of one of those fields
+    @return float64 value of every field
+    """
+    values = np.zeros(len(field_ends))
+    reading = np.ones(len(field_ends), dtype=bool)
+    position = field_ends
+    scale = 1.0
+    while True:
+        position = position - 1
+        # a field at the start of data wraps round to the final line terminator
+        digits = data.take(position, mode="wrap") - ord("0")
+        # anything but a digit is above 9 in uint8
+        reading &= digits < 10
+        if not reading.any():
+            break
+        values += np.where(reading, digits * scale, 0.0)
+        scale *= 10
+    values[np.searchsorted(field_ends, minus)] *= -1
+    return values
+
+
+def within_limits(values, limits):
+    """ @return (N,) bool, rows of values whose every field is inside its (low, high) """
+    return np.all((values >= limits[:, 0]) & (values <= limits[:, 1]), axis=1)
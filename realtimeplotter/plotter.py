@@ -3,6 +3,10 @@ Plotter
 This class handles the entire plotting infrastructure. 
 The graph is a scatter plot and is pannable and zoomable. 
 """
+import sys
+import time
+
+import numpy as np
 from PyQt5.QtDataVisualization import (
     Q3DCamera,
     Q3DScatter,
@@ -16,8 +20,10 @@ from PyQt5.QtDataVisualization import (
     QScatterDataItem
 )
 from PyQt5.QtWidgets import QWidget, QSizePolicy
-from PyQt5.QtCore import QTimer, QObject, QSize, Qt
-from PyQt5.QtGui import QColor, QColorConstants, QFont
+from PyQt5.QtCore import QTimer, QObject, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QColorConstants, QFont, QVector3D
+
+from realtimeplotter.watchdog import hot_path
 
 
 
@@ -33,6 +39,15 @@ Y_AXIS_MAX = AXIS_MAX
 Z_AXIS_MIN = AXIS_MIN
 Z_AXIS_MAX = AXIS_MAX
 
+"""
+Display budget, None means unlimited
+max points  once reached the oldest items are overwritten in place
+max age     items older than this many seconds are removed
+"""
+DISPLAY_MAX_POINTS = None
+DISPLAY_MAX_AGE = None
+DISPLAY_EXPIRE_INTERVAL = 500
+
 
 def CreateAxisHelper(
     axis_proxy, axis_title, axis_title_visible, axis_segs, axis_subsegs
@@ -47,10 +62,26 @@ def CreateAxisHelper(
 
 
 class Plotter(QObject):
-    def __init__(self):
+    zoom_changed = pyqtSignal(float)
+
+    def __init__(self, max_points=DISPLAY_MAX_POINTS, max_age=DISPLAY_MAX_AGE, series=None):
+        """
+        @param series a QScatter3DSeries to fill instead of building the graph window,
+        for headless use, Q3DScatter needs an OpenGL context that offscreen hosts lack
+        """
         super(Plotter, self).__init__()
-        self.graph = Q3DScatter()
-        self.setUpUi()     
+        self.graph = Q3DScatter() if series is None else None
+        self.expire_timer = QTimer(self)
+        self.expire_timer.setInterval(DISPLAY_EXPIRE_INTERVAL)
+        self.expire_timer.timeout.connect(self.expire_items)
+        self.max_points = None
+        self.max_age = None
+        if series is None:
+            self.setUpUi()
+        else:
+            self.scatter_series = series
+            self.reset_graph()
+        self.set_display_budget(max_points, max_age)
         
     def setUpUi(self):
         self.graph.setAspectRatio(1.0)
@@ -64,14 +95,117 @@ class Plotter(QObject):
         self.reset_graph()
         self.set_graph_axis()
         
+    @hot_path
     def add_new_item(self, pos):
         point = QScatterDataItem(pos)
         self.scatter_proxy.addItem(point)
 
+    @hot_path
+    def add_items(self, points):
+        """
+        add every row of an (N, 3) array of graph coordinates with a single proxy update
+
+        With a display budget the proxy is used as a ring: items are inserted at the
+        cursor until the budget is reached, after that the oldest items are overwritten
+        in place with setItems. In storage order the oldest item sits at the cursor.
+        """
+        capacity = self.max_points or sys.maxsize
+        items = [
+            QScatterDataItem(QVector3D(x_val, y_val, z_val))
+            for x_val, y_val, z_val in points[-capacity:].tolist()
+        ]
+        now = time.time()
+        size = self.scatter_proxy.itemCount()
+
+        grow = min(len(items), capacity - size)
+        if grow:
+            if self.cursor == size:
+                self.scatter_proxy.addItems(items[:grow])
+            else:
+                self.scatter_proxy.insertItems(self.cursor, items[:grow])
+            if self.max_age:
+                self.item_times = np.insert(self.item_times, self.cursor, np.full(grow, now))
+            self.cursor += grow
+            if size + grow == capacity:
+                self.cursor %= capacity
+
+        items = items[grow:]
+        while items:
+            span = min(len(items), capacity - self.cursor)
+            self.scatter_proxy.setItems(self.cursor, items[:span])
+            if self.max_age:
+                self.item_times[self.cursor:self.cursor + span] = now
+            self.cursor = (self.cursor + span) % capacity
+            items = items[span:]
+
+    def set_items(self, points):
+        """
+        replace everything on display with an (N, 3) array of graph coordinates
+        """
+        self.scatter_proxy.resetArray(
+            [QScatterDataItem(QVector3D(x_val, y_val, z_val)) for x_val, y_val, z_val in points.tolist()]
+        )
+        self.cursor = 0 if self.max_points and len(points) >= self.max_points else len(points)
+        self.item_times = np.full(len(points), time.time())
+
+    def set_measure_fps(self, enabled):
+        self.graph.setMeasureFps(enabled)
+
+    def frame_time(self):
+        """ seconds per frame over the last measurement, 0 while fps is not measured """
+        fps = self.graph.currentFps()
+        return 1.0 / fps if fps > 0 else 0.0
+
+    def zoom_level(self):
+        return self.graph.scene().activeCamera().zoomLevel()
+
+    def expire_items(self):
+        """
+        remove items that have been on display for longer than max_age
+        """
+        size = self.scatter_proxy.itemCount()
+        if not self.max_age or not size:
+            return
+        ordered = np.concatenate((self.item_times[self.cursor:], self.item_times[:self.cursor]))
+        expired = int(np.searchsorted(ordered, time.time() - self.max_age))
+        if not expired:
+            return
+
+        tail = min(expired, size - self.cursor)
+        head = expired - tail
+        if tail:
+            self.scatter_proxy.removeItems(self.cursor, tail)
+        if head:
+            self.scatter_proxy.removeItems(0, head)
+        self.item_times = np.delete(
+            self.item_times, np.r_[0:head, self.cursor:self.cursor + tail]
+        )
+        self.cursor -= head
+
+    def set_display_budget(self, max_points=None, max_age=None):
+        """
+        limit what is on display to max_points items and/or items younger than max_age seconds
+        """
+        size = self.scatter_proxy.itemCount()
+        if max_points is not None and size > max_points:
+            # the ring layout only holds for the budget it was built with, start over
+            self.reset_graph()
+            size = 0
+        if max_age and not self.max_age:
+            self.item_times = np.full(size, time.time())
+        self.max_points = max_points
+        self.max_age = max_age
+        if max_age:
+            self.expire_timer.start()
+        else:
+            self.expire_timer.stop()
+
     def reset_graph(self):
         self.scatter_proxy = QScatterDataProxy()
         self.scatter_series.setDataProxy(self.scatter_proxy)
         self.counter = 0
+        self.cursor = 0
+        self.item_times = np.empty(0)
         
     
     def enable_rotation(self):
@@ -83,6 +217,7 @@ class Plotter(QObject):
     def disable_rotation(self):
         self.plot_timer.stop()
     
+    @hot_path
     def rotate_x_axis(self):
         x_rot = self.graph.scene().activeCamera().xRotation()        
         self.graph.scene().activeCamera().setXRotation(x_rot + 0.5)
@@ -142,6 +277,7 @@ class Plotter(QObject):
             Q3DCamera.CameraPresetIsometricRight
         )
         self.graph.scene().activeCamera().setZoomLevel(150.0)
+        self.graph.scene().activeCamera().zoomLevelChanged.connect(self.zoom_changed)
     
     def set_graph_axis(self):
         """ Configure axis"""
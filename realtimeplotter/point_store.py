@@ -0,0 +1,147 @@
+"""
+PointStore
+Fixed capacity ring buffer of structured NumPy records, the one place received points
+are kept. Everything is preallocated up front so a long session stops growing once the
+buffer is full.
+
+Each record is 36 bytes:
+    position    float32 x, y, z in cartesian coordinates
+    raw         float32 values as received (azimuth, elevation, range in production)
+    timestamp   float64 host time the point was read
+    sequence    uint32 sequence number from the decoder
+"""
+import numpy as np
+
+
+POINT_DTYPE = np.dtype(
+    [
+        ("position", "<f4", (3,)),
+        ("raw", "<f4", (3,)),
+        ("timestamp", "<f8"),
+        ("sequence", "<u4"),
+    ]
+)
+
+POINT_STORE_CAPACITY = 2_000_000
+WINDOW_POINTS = 1 << 18
+
+OVERWRITE_OLDEST = "overwrite"
+REJECT_WHEN_FULL = "reject"
+STORE_POLICIES = (OVERWRITE_OLDEST, REJECT_WHEN_FULL)
+
+
+class PointStore:
+    """
+    Ring buffer of POINT_DTYPE records.
+
+    When full, OVERWRITE_OLDEST drops the oldest records to make room and
+    REJECT_WHEN_FULL drops the incoming ones. Both are counted.
+    """
+
+    def __init__(self, capacity=POINT_STORE_CAPACITY, policy=OVERWRITE_OLDEST):
+        if policy not in STORE_POLICIES:
+            raise ValueError(f"unknown store policy {policy!r}")
+        self.capacity = capacity
+        self.policy = policy
+        self.records = np.zeros(capacity, dtype=POINT_DTYPE)
+        # contiguous copy of a wrapped buffer for view(), allocated on first use
+        self.unwrapped = None
+        self.clear()
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+        self.overwritten = 0
+        self.rejected = 0
+
+    def append(self, position, raw=None, timestamp=0.0, sequence=0):
+        """
+        Store a batch of points, returns how many were kept.
+        @param position (N, 3) cartesian coordinates
+        @param raw (N, 3) values as received, defaults to position
+        @param timestamp scalar or (N,) host times
+        @param sequence scalar or (N,) sequence numbers
+        """
+        count = len(position)
+        batch = np.empty(count, dtype=POINT_DTYPE)
+        batch["position"] = position
+        batch["raw"] = position if raw is None else raw
+        batch["timestamp"] = timestamp
+        batch["sequence"] = sequence
+
+        if self.policy == REJECT_WHEN_FULL:
+            keep = min(count, self.capacity - self.size)
+            self.rejected += count - keep
+            batch = batch[:keep]
+        elif count > self.capacity:
+            self.overwritten += count - self.capacity
+            batch = batch[-self.capacity:]
+
+        count = len(batch)
+        end = (self.start + self.size) % self.capacity
+        first = min(count, self.capacity - end)
+        self.records[end:end + first] = batch[:first]
+        self.records[:count - first] = batch[first:]
+
+        overflow = max(0, self.size + count - self.capacity)
+        self.overwritten += overflow
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + count)
+        return count
+
+    def segments(self):
+        """
+        The stored records, oldest first, as one or two views into the buffer.
+        Nothing is copied.
+        """
+        stop = self.start + self.size
+        if stop <= self.capacity:
+            return [self.records[self.start:stop]]
+        return [self.records[self.start:], self.records[:stop - self.capacity]]
+
+    def view(self):
+        """
+        The stored records, oldest first, as a single contiguous array.
+        Until the buffer wraps this is a view. After that the two segments are copied
+        into one buffer allocated once and reused, so the returned array is only valid
+        until the next call. segments() and iter_xyz() never copy.
+        """
+        segments = self.segments()
+        if len(segments) == 1:
+            return segments[0]
+        if self.unwrapped is None:
+            self.unwrapped = np.empty(self.capacity, dtype=POINT_DTYPE)
+        head, tail = segments
+        self.unwrapped[:len(head)] = head
+        self.unwrapped[len(head):self.size] = tail
+        return self.unwrapped[:self.size]
+
+    def iter_xyz(self, window=WINDOW_POINTS, start=0):
+        """
+        The stored positions from the start-th oldest on, as (N, 3) views of at most
+        window points. Unlike view() a wrapped buffer is left as it is.
+        """
+        for segment in self.segments():
+            if start >= len(segment):
+                start -= len(segment)
+                continue
+            segment, start = segment[start:], 0
+            for offset in range(0, len(segment), window):
+                yield segment["position"][offset:offset + window]
+
+    def latest(self, count):
+        """ the newest count records, oldest first """
+        if not count:
+            return self.records[:0]
+        segments = self.segments()
+        if len(segments[-1]) >= count or len(segments) == 1:
+            return segments[-1][-count:]
+        head, tail = segments
+        return np.concatenate((head[len(head) + len(tail) - count:], tail))
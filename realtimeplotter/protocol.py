@@ -0,0 +1,271 @@
+"""
+Protocol
+Wire formats spoken between the board (or the LivePlotSimulator) and the plotter.
+
+ascii   one "a,b,c\\r\\n" line per point, parsed by realtimeplotter.parsing.LineParser
+binary  fixed size little-endian frames, 12 bytes per point:
+
+    offset  size  field
+    0       2     sync word 0xAA 0x55
+    2       2     sequence number, uint16, wraps around
+    4       6     three int16 values (x, y, z or azimuth, elevation, distance),
+                  -32768 to 32767, encode_frames() refuses anything else
+    10      2     CRC-16/CCITT-FALSE of bytes 2..9
+
+The decoder scans for the sync word and only accepts frames whose CRC matches, so it
+falls back into step on its own after dropped or corrupted bytes.
+
+Both decoders take optional limits, ((low, high), ...) per value, records outside them
+are counted as rejected like any other bad record.
+"""
+import numpy as np
+
+from realtimeplotter.parsing import LineParser, within_limits
+
+
+WIRE_FORMAT_ASCII = "ascii"
+WIRE_FORMAT_BINARY = "binary"
+WIRE_FORMATS = (WIRE_FORMAT_ASCII, WIRE_FORMAT_BINARY)
+
+SYNC_WORD = b"\xaa\x55"
+FRAME_DTYPE = np.dtype(
+    [
+        ("sync", "<u2"),
+        ("sequence", "<u2"),
+        ("values", "<i2", (3,)),
+        ("crc", "<u2"),
+    ]
+)
+FRAME_SIZE = FRAME_DTYPE.itemsize
+CRC_START = 2
+CRC_STOP = 10
+FRAME_VALUE_MIN = np.iinfo(np.int16).min
+FRAME_VALUE_MAX = np.iinfo(np.int16).max
+
+SEQUENCE_MODULO = 1 << 16
+# missing sequence numbers remembered so a record arriving late is not counted as lost
+REORDER_WINDOW = 1024
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[byte] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(rows):
+    """
+    CRC-16/CCITT-FALSE of every row of an (N, M) uint8 array.
+    The loop runs over the M byte columns, each step handles all N frames at once.
+    """
+    crc = np.full(len(rows), 0xFFFF, dtype=np.uint16)
+    for column in rows.T:
+        crc = (crc << 8) ^ CRC_TABLE[(crc >> 8) ^ column]
+    return crc
+
+
+def _frame_crc_ok(rows):
+    return crc16(rows[:, CRC_START:CRC_STOP]) == (
+        rows[:, CRC_STOP].astype(np.uint16) | (rows[:, CRC_STOP + 1].astype(np.uint16) << 8)
+    )
+
+
+def encode_frames(values, first_sequence=0):
+    """
+    Pack an (N, 3) array of integers into binary frames, returns the bytes to send.
+    Raises ValueError for values outside int16, they would wrap and still pass the CRC.
+    """
+    values = np.asarray(values)
+    if len(values) and (values.min() < FRAME_VALUE_MIN or values.max() > FRAME_VALUE_MAX):
+        raise ValueError(
+            f"binary frames carry values from {FRAME_VALUE_MIN} to {FRAME_VALUE_MAX}, "
+            f"got {values.min()} to {values.max()}"
+        )
+    frames = np.zeros(len(values), dtype=FRAME_DTYPE)
+    frames["sync"] = np.frombuffer(SYNC_WORD, dtype="<u2")[0]
+    frames["sequence"] = (first_sequence + np.arange(len(values))) % SEQUENCE_MODULO
+    frames["values"] = values
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames["crc"] = crc16(raw[:, CRC_START:CRC_STOP])
+    return frames.tobytes()
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for binary frames.
+
+    feed() accepts any number of bytes and returns the (N, 3) values and the sequence
+    numbers of every valid frame found. Sequence numbers are unwrapped into a running
+    count so gaps can be spotted across the uint16 roll over.
+    """
+
+    # a lost frame shows as a sequence gap
+    sequenced = True
+
+    def __init__(self, limits=None):
+        self.limits = None if limits is None else np.asarray(limits, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self.carry = b""
+        self.last_sequence = None
+        self.highest_sequence = None
+        self.missing = np.empty(0, dtype=np.int64)
+        self.rejected = 0
+        self.dropped_bytes = 0
+        self.sequence_gaps = 0
+
+    def feed(self, data):
+        buffer = np.frombuffer(self.carry + bytes(data), dtype=np.uint8)
+        last_start = len(buffer) - FRAME_SIZE
+        if last_start < 0:
+            self.carry = buffer.tobytes()
+            return np.empty((0, 3)), np.empty(0, dtype=np.int64)
+
+        failed = ()
+        # fast path, a clean stream is a run of back to back frames from the first byte
+        count = len(buffer) // FRAME_SIZE
+        rows = buffer[:count * FRAME_SIZE].reshape(count, FRAME_SIZE)
+        if (
+            np.all(rows[:, 0] == SYNC_WORD[0])
+            and np.all(rows[:, 1] == SYNC_WORD[1])
+            and np.all(_frame_crc_ok(rows))
+        ):
+            starts = np.arange(count) * FRAME_SIZE
+        else:
+            starts = np.flatnonzero(
+                (buffer[:last_start + 1] == SYNC_WORD[0]) & (buffer[1:last_start + 2] == SYNC_WORD[1])
+            )
+            rows = buffer[starts[:, None] + np.arange(FRAME_SIZE)]
+            valid = _frame_crc_ok(rows)
+            failed = starts[~valid]
+            starts, rows = starts[valid], rows[valid]
+
+        # a sync word inside the payload of a good frame can pass the CRC by chance,
+        # only keep frames that do not overlap the frame accepted before them
+        if len(starts) > 1 and np.any(np.diff(starts) < FRAME_SIZE):
+            keep = np.zeros(len(starts), dtype=bool)
+            end = 0
+            for index, start in enumerate(starts.tolist()):
+                if start >= end:
+                    keep[index] = True
+                    end = start + FRAME_SIZE
+            starts, rows = starts[keep], rows[keep]
+
+        if len(failed):
+            self.rejected += self._count_rejected(failed, starts)
+
+        end = int(starts[-1]) + FRAME_SIZE if len(starts) else 0
+        keep_from = max(end, last_start + 1)
+        self.dropped_bytes += keep_from - len(starts) * FRAME_SIZE
+        self.carry = buffer[keep_from:].tobytes()
+
+        frames = np.ascontiguousarray(rows).view(FRAME_DTYPE).ravel()
+        values, sequence = frames["values"].astype(np.float64), self._unwrap(frames["sequence"])
+        if self.limits is not None:
+            # sequence numbers are unwrapped first so rejected frames do not show as gaps
+            inside = within_limits(values, self.limits)
+            self.rejected += len(values) - int(np.count_nonzero(inside))
+            values, sequence = values[inside], sequence[inside]
+        return values, sequence
+
+    @staticmethod
+    def _count_rejected(failed, starts):
+        """
+        sync words failing the CRC, those lying inside an accepted frame are just
+        payload bytes that happen to look like a sync word
+        """
+        if not len(starts):
+            return len(failed)
+        index = np.searchsorted(starts, failed, side="right") - 1
+        inside = (index >= 0) & (failed - starts[np.maximum(index, 0)] < FRAME_SIZE)
+        return int(np.count_nonzero(~inside))
+
+    def _unwrap(self, sequence):
+        if not len(sequence):
+            return np.empty(0, dtype=np.int64)
+        sequence = sequence.astype(np.int64)
+        previous = sequence[0] - 1 if self.last_sequence is None else self.last_sequence
+        step = np.diff(sequence, prepend=previous % SEQUENCE_MODULO) % SEQUENCE_MODULO
+        # steps past half the range are records arriving late, not huge gaps
+        step = np.where(step >= SEQUENCE_MODULO // 2, step - SEQUENCE_MODULO, step)
+        unwrapped = previous + np.cumsum(step)
+        self.last_sequence = int(unwrapped[-1])
+        self._count_gaps(unwrapped)
+        return unwrapped
+
+    def _count_gaps(self, unwrapped):
+        """
+        Gaps are counted against the highest sequence number seen so far, a record
+        filling a gap later takes it back and a repeated one is ignored.
+        """
+        start = unwrapped[0] - 1 if self.highest_sequence is None else self.highest_sequence
+        highest = np.maximum.accumulate(np.concatenate(([start], unwrapped)))
+        self.highest_sequence = int(highest[-1])
+        behind = highest[:-1]
+        jump = unwrapped - behind - 1
+        ahead = jump > 0
+        late = jump < -1
+        if not ahead.any() and not late.any():
+            return
+        missing = [self.missing] + [
+            np.arange(max(low + 1, high - REORDER_WINDOW), high)
+            for low, high in zip(behind[ahead].tolist(), unwrapped[ahead].tolist())
+        ]
+        missing = np.concatenate(missing)
+        filled = np.intersect1d(missing, unwrapped[late])
+        self.sequence_gaps += int(jump[ahead].sum()) - len(filled)
+        self.missing = np.setdiff1d(missing, filled)[-REORDER_WINDOW:]
+
+
+class LineDecoder(LineParser):
+    """
+    LineParser with the FrameDecoder interface, ascii lines carry no sequence number
+    so they are numbered in the order they arrive and gaps can not be seen.
+    """
+
+    # a lost line only shows when it arrives damaged and is rejected
+    sequenced = False
+
+    def reset(self):
+        super(LineDecoder, self).reset()
+        self.next_sequence = 0
+        self.dropped_bytes = 0
+        self.sequence_gaps = 0
+
+    def feed(self, data):
+        values = super(LineDecoder, self).feed(data)
+        sequence = np.arange(self.next_sequence, self.next_sequence + len(values))
+        self.next_sequence += len(values)
+        return values, sequence
+
+
+def make_decoder(wire_format, limits=None):
+    if wire_format == WIRE_FORMAT_BINARY:
+        return FrameDecoder(limits)
+    if wire_format == WIRE_FORMAT_ASCII:
+        return LineDecoder(limits)
+    raise ValueError(f"unknown wire format {wire_format!r}")
+
+
+def encode_lines(values):
+    """
+    Format an (N, 3) array of integers as ascii lines with a single string operation.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    return ("%d,%d,%d\r\n" * len(values) % tuple(values.ravel().tolist())).encode()
+
+
+def encode_points(values, wire_format, first_sequence=0):
+    if wire_format == WIRE_FORMAT_BINARY:
+        return encode_frames(values, first_sequence)
+    if wire_format == WIRE_FORMAT_ASCII:
+        return encode_lines(values)
+    raise ValueError(f"unknown wire format {wire_format!r}")
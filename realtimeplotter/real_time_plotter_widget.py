@@ -1,26 +1,45 @@
 """
 RealTimePlotterWidget
 """
-import math
+import os
+import time
 
-from PyQt5 import QtSerialPort
-from PyQt5.QtCore import pyqtSlot, Qt, QTimer, QIODevice
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
 from PyQt5.QtWidgets import (
     QLCDNumber,
     QWidget,
-    QTextEdit,
+    QSpinBox,
+    QLabel,
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
     QGroupBox,
     QGridLayout,
-    QFrame
+    QFrame,
+    QComboBox,
+    QDoubleSpinBox,
+    QFileDialog,
 )
 
 from PyQt5.QtDataVisualization import Q3DScatter
-from PyQt5.QtGui import QVector3D
+from PyQt5.QtGui import QFontDatabase
 
 from realtimeplotter.plotter import Plotter
+from realtimeplotter.log_console import LogConsole
+from realtimeplotter.render_scheduler import RenderScheduler, RENDER_RATE
+from realtimeplotter.protocol import WIRE_FORMATS, WIRE_FORMAT_ASCII
+from realtimeplotter.serial_reader import SerialReader
+from realtimeplotter.transports import BAUD_RATE, STANDARD_BAUD_RATES, TRANSPORT_SERIAL, split_spec
+from realtimeplotter.transform import SphericalTransform
+from realtimeplotter.lod import LevelOfDetail
+from realtimeplotter.tracing import TRACER
+from realtimeplotter.stats import STATS_REFRESH_INTERVAL
+from realtimeplotter.watchdog import EventLoopWatchdog, PROFILER, hot_path
+from realtimeplotter.recorder import SessionRecorder, RECORDING_DIRECTORY
+from realtimeplotter.replay import SessionReplay, REPLAY_MAX_SPEED
+from realtimeplotter.point_store import PointStore, POINT_STORE_CAPACITY, OVERWRITE_OLDEST
+from realtimeplotter.mmap_store import MappedPointStore
+from realtimeplotter.export import StoreExport
 from realtimeplotter.detailed_graph_widget import DetailedGraphWidget
 from realtimeplotter.custom_scan_widget import CustomScanWidget
 from realtimeplotter.helpers import GenericLayoutHelper, LCDWidgetHelper
@@ -38,6 +57,22 @@ Methods from this class control the user interaction.
 
 
 COM_PORT = "COM5"
+WIRE_FORMAT = WIRE_FORMAT_ASCII
+
+""" points kept on the live plot, the full session stays in the point store """
+DISPLAY_MAX_POINTS = 50_000
+DISPLAY_MAX_AGE = None
+
+""" full scan view, the whole point store decimated to the render budget """
+LOD_REFRESH_INTERVAL = 500
+LOD_ZOOM_DELAY = 300
+
+""" latency tracing """
+TRACE_REFRESH_INTERVAL = 500
+TRACE_REPORT_FILE = "latency_report.json"
+
+""" hot path profiling, the dump opens with python -m pstats, snakeviz or flameprof """
+PROFILE_REPORT_FILE = "hot_path.pstats"
 
 STYLE_BUTTON_TOGGLED_OFF = "background-color:red;color:black;"
 STYLE_BUTTON_TOGGLED_ON = "background-color:green;color:white;"
@@ -57,27 +92,34 @@ class RealTimePlotterWidget(QWidget):
     The constructor.
     """
 
-    def __init__(self, parent=None):
+    def __init__(
+        self,
+        parent=None,
+        port_name=COM_PORT,
+        wire_format=WIRE_FORMAT,
+        point_store_capacity=POINT_STORE_CAPACITY,
+        point_store_policy=OVERWRITE_OLDEST,
+        point_store_directory=None,
+        render_rate=RENDER_RATE,
+        display_max_points=DISPLAY_MAX_POINTS,
+        display_max_age=DISPLAY_MAX_AGE,
+        scan_limits=None,
+    ):
         super(RealTimePlotterWidget, self).__init__(parent)
         """
         Text and Line Edits
         """
-        self.textedit_output = QTextEdit(readOnly=True)
-        
+        self.textedit_output = LogConsole()
+        self.spinbox_log_sampling = QSpinBox(prefix="Show every ", suffix=" lines", minimum=1, maximum=1000)
+        self.spinbox_log_sampling.valueChanged.connect(self.textedit_output.set_sample_every)
         
-        """
-        Timers (ms) 
-        """
-        self.timer = QTimer(self)
-        self.timer.setInterval(100)
-        self.timer.start()
-        self.timer.timeout.connect(self.receive)
 
         """
         Graphing 
         """
-        self.graph_instance = Plotter()
+        self.graph_instance = Plotter(display_max_points, display_max_age)
         self.graph_container = self.graph_instance.graph_container
+        self.render_scheduler = RenderScheduler(self.graph_instance, render_rate, self)
 
         """
         Buttons 
@@ -88,6 +130,39 @@ class RealTimePlotterWidget(QWidget):
         self.button_connect.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
         self.button_connect.setFixedHeight(BUTTON_HEIGHT)
 
+        self.combobox_wire_format = QComboBox()
+        self.combobox_wire_format.addItems(WIRE_FORMATS)
+        self.combobox_wire_format.setCurrentText(wire_format)
+        self.combobox_wire_format.currentTextChanged.connect(self.set_wire_format)
+
+        # baud rate of a serial connection, the other transports have no line rate
+        scheme, _, transport_options = split_spec(port_name)
+        self.combobox_baud_rate = QComboBox()
+        self.combobox_baud_rate.addItems([f"{rate} baud" for rate in STANDARD_BAUD_RATES])
+        baud_rate = transport_options.get("baud_rate", BAUD_RATE)
+        if baud_rate not in STANDARD_BAUD_RATES:
+            self.combobox_baud_rate.addItem(f"{baud_rate} baud")
+        self.combobox_baud_rate.setCurrentText(f"{baud_rate} baud")
+        self.combobox_baud_rate.setEnabled(scheme == TRANSPORT_SERIAL)
+        self.combobox_baud_rate.currentTextChanged.connect(self.set_baud_rate)
+
+        self.button_record = QPushButton(
+            text="Record", checkable=True, toggled=self.toggle_recording
+        )
+        self.button_record.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+        self.button_record.setFixedHeight(BUTTON_HEIGHT)
+
+        self.button_replay = QPushButton(
+            text="Replay Session", checkable=True, toggled=self.toggle_replay
+        )
+        self.button_replay.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+        self.button_replay.setFixedHeight(BUTTON_HEIGHT)
+        self.spinbox_replay_speed = QDoubleSpinBox(
+            prefix="x", minimum=REPLAY_MAX_SPEED, maximum=1000.0, value=1.0, singleStep=0.5
+        )
+        self.spinbox_replay_speed.setSpecialValueText("max speed")
+        self.replay = None
+
         self.button_quick_scan = QPushButton()
         self.button_quick_scan.setFixedHeight(BUTTON_HEIGHT)
         self.button_quick_scan.setText("Quick Scan")
@@ -124,13 +199,71 @@ class RealTimePlotterWidget(QWidget):
         )
         self.button_toggle_rotation.setFixedHeight(BUTTON_HEIGHT)
         self.button_toggle_rotation.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+
+        self.button_toggle_lod = QPushButton(
+            self,
+            text="Full Scan",
+            checkable=True,
+            toggled=self.toggle_lod
+        )
+        self.button_toggle_lod.setFixedHeight(BUTTON_HEIGHT)
+        self.button_toggle_lod.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+
+        self.button_export = QPushButton(self, text="Export", clicked=self.button_export_click)
+        self.button_export.setFixedHeight(BUTTON_HEIGHT)
+        self.export = None
         
+        self.button_toggle_tracing = QPushButton(
+            self,
+            text="Trace Latency",
+            checkable=True,
+            toggled=self.toggle_tracing
+        )
+        self.button_toggle_tracing.setFixedHeight(BUTTON_HEIGHT)
+        self.button_toggle_tracing.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+
+        self.button_dump_trace = QPushButton(self, text="Dump Report", clicked=self.button_dump_trace_click)
+        self.button_dump_trace.setFixedHeight(BUTTON_HEIGHT)
+
+        self.button_toggle_profiler = QPushButton(
+            self,
+            text="Profile",
+            checkable=True,
+            toggled=self.toggle_profiler
+        )
+        self.button_toggle_profiler.setFixedHeight(BUTTON_HEIGHT)
+        self.button_toggle_profiler.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+
+        self.button_toggle_watchdog = QPushButton(
+            self,
+            text="Watchdog",
+            checkable=True,
+            toggled=self.toggle_watchdog
+        )
+        self.button_toggle_watchdog.setFixedHeight(BUTTON_HEIGHT)
+        self.button_toggle_watchdog.setStyleSheet(STYLE_BUTTON_TOGGLED_OFF)
+
+        self.label_trace = QLabel()
+        self.label_trace.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.label_trace.setVisible(False)
+
+        self.trace_timer = QTimer(self)
+        self.trace_timer.setInterval(TRACE_REFRESH_INTERVAL)
+        self.trace_timer.timeout.connect(self.refresh_trace)
+
         self.lcd_plot_counter = QLCDNumber()
         self.lcd_plot_counter.setFixedHeight(BUTTON_HEIGHT)
         self.lcd_plot_counter.setFrameShape(QFrame.NoFrame)
         self.lcd_plot_counter.setFrameShadow(QFrame.Plain)
         self.lcd_plot_counter.setSmallDecimalPoint(False)
-        self.graph_instance.scatter_proxy.itemCountChanged.connect(self.lcd_plot_counter.display)
+
+        self.label_stats = QLabel()
+        self.label_stats.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+
+        # counters are read a few times a second instead of on every item added
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_REFRESH_INTERVAL)
+        self.stats_timer.timeout.connect(self.refresh_stats)
         """
         commands 
         """
@@ -143,8 +276,32 @@ class RealTimePlotterWidget(QWidget):
         self.command_d = "d"
         self.command_h = "h"
 
-        self.plotbank = []
+        # a directory keeps the whole session on disk instead of a ring in memory
+        if point_store_directory:
+            self.point_store = MappedPointStore(point_store_directory)
+        else:
+            self.point_store = PointStore(point_store_capacity, point_store_policy)
+        self.transform = SphericalTransform()
+
+        """
+        Level of detail for the full scan view
+        """
+        self.lod = LevelOfDetail()
+        self.lod_dirty = False
+        self.live_display_budget = (display_max_points, display_max_age)
+        self.lod_timer = QTimer(self)
+        self.lod_timer.setInterval(LOD_REFRESH_INTERVAL)
+        self.lod_timer.timeout.connect(self.refresh_lod)
+        # a rebuild for a new zoom waits for the wheel to stop and runs on a thread
+        self.lod_rebuild = None
+        self.lod_zoom = None
+        self.lod_zoom_timer = QTimer(self)
+        self.lod_zoom_timer.setSingleShot(True)
+        self.lod_zoom_timer.setInterval(LOD_ZOOM_DELAY)
+        self.lod_zoom_timer.timeout.connect(self.on_zoom_settled)
+        self.graph_instance.zoom_changed.connect(self.on_zoom_changed)
         self.counter = 0    
+        self.wire_format = wire_format
         
         """
         Layout 
@@ -158,6 +315,7 @@ class RealTimePlotterWidget(QWidget):
         gbox_received_data = QGroupBox(title="Data Received")
         vbox_received_data = QVBoxLayout()
         vbox_received_data.addWidget(self.textedit_output)
+        vbox_received_data.addWidget(self.spinbox_log_sampling)
         gbox_received_data.setLayout(vbox_received_data)
         
         gbox_scan_controls = QGroupBox(title="Scans")
@@ -178,25 +336,45 @@ class RealTimePlotterWidget(QWidget):
         hbox_graph_controls = QHBoxLayout()
         hbox_graph_controls.addWidget(self.button_reset_plot)
         hbox_graph_controls.addWidget(self.button_toggle_rotation)
+        hbox_graph_controls.addWidget(self.button_toggle_lod)
+        hbox_graph_controls.addWidget(self.button_export)
         gbox_graph_controls.setLayout(hbox_graph_controls)
         
         gbox_plot_counter = QGroupBox(title="Points Plotted")
-        hbox_plot_counter = QHBoxLayout()
-        hbox_plot_counter.addWidget(self.lcd_plot_counter)
-        gbox_plot_counter.setLayout(hbox_plot_counter)
+        vbox_plot_counter = QVBoxLayout()
+        vbox_plot_counter.addWidget(self.lcd_plot_counter)
+        vbox_plot_counter.addWidget(self.label_stats)
+        gbox_plot_counter.setLayout(vbox_plot_counter)
         
         gbox_serial_connection = QGroupBox(title="Serial Connection")
         vbox_serial_connection = QVBoxLayout()
         vbox_serial_connection.addWidget(self.button_connect)
+        vbox_serial_connection.addWidget(self.combobox_wire_format)
+        vbox_serial_connection.addWidget(self.combobox_baud_rate)
+        vbox_serial_connection.addWidget(self.button_record)
+        vbox_serial_connection.addWidget(self.button_replay)
+        vbox_serial_connection.addWidget(self.spinbox_replay_speed)
         gbox_serial_connection.setLayout(vbox_serial_connection)
         
+        gbox_diagnostics = QGroupBox(title="Diagnostics")
+        vbox_diagnostics = QVBoxLayout()
+        hbox_diagnostics_buttons = QHBoxLayout()
+        hbox_diagnostics_buttons.addWidget(self.button_toggle_tracing)
+        hbox_diagnostics_buttons.addWidget(self.button_dump_trace)
+        hbox_diagnostics_buttons.addWidget(self.button_toggle_profiler)
+        hbox_diagnostics_buttons.addWidget(self.button_toggle_watchdog)
+        vbox_diagnostics.addLayout(hbox_diagnostics_buttons)
+        vbox_diagnostics.addWidget(self.label_trace)
+        gbox_diagnostics.setLayout(vbox_diagnostics)
+
         gridLayout = QGridLayout(self)
         gbox_received_data.setMaximumWidth(300)
         gbox_graph_controls.setMaximumWidth(300)
         gbox_serial_connection.setMaximumWidth(300)
         gbox_plot_counter.setMaximumWidth(300)
+        gbox_diagnostics.setMaximumWidth(300)
         
-        gridLayout.addWidget(gbox_live_plot, 0, 0 , 5 , 1)
+        gridLayout.addWidget(gbox_live_plot, 0, 0 , 6 , 1)
         
         gridLayout.addWidget(gbox_serial_connection, 0, 1, 1, 2)
         gridLayout.addWidget(gbox_plot_counter, 1, 1, 1 , 2)
@@ -208,6 +386,8 @@ class RealTimePlotterWidget(QWidget):
         
         gridLayout.addWidget(gbox_received_data, 4, 1, 1, 2)
 
+        gridLayout.addWidget(gbox_diagnostics, 5, 1, 1, 2)
+
         self.setLayout(gridLayout)
         self.setWindowTitle("Live Data Plotter")    
         self.setStyleSheet(STYLESHEET)
@@ -215,12 +395,22 @@ class RealTimePlotterWidget(QWidget):
 
         """
         Serial Connection configuration 
+        the port is owned and read by the reader thread, decoded points arrive as queued signals
+        scan_limits (e.g. custom_scan_widget.SCAN_LIMITS) rejects records outside the scan
         """
-        self.serial = QtSerialPort.QSerialPort(
-            COM_PORT, baudRate=QtSerialPort.QSerialPort.Baud9600, readyRead=self.receive
-        )
+        self.reader = SerialReader(port_name, wire_format, limits=scan_limits)
+        self.reader.points_received.connect(self.receive)
+        self.reader.connection_changed.connect(self.on_connection_changed)
+        self.render_scheduler.flushed.connect(self.reader.stats.count_plotted)
+        self.reader.open()
+        self.stats_timer.start()
 
-        self.serial.open(self.serial.ReadWrite)
+        """
+        Event loop watchdog, stalls of the GUI thread are logged with the stack that caused them
+        started with the Watchdog button
+        """
+        self.watchdog = EventLoopWatchdog(parent=self)
+        self.watchdog.stalled.connect(self.on_stalled)
         
 
 
@@ -229,42 +419,67 @@ class RealTimePlotterWidget(QWidget):
         
 
     """
-    Method to read from serial, convert the data and send it to be plotted  
+    Method to take a batch of points decoded by the reader thread and send it to be plotted  
     """
     #  @param self The object pointer
+    #  @param points (N, 3) values as received
+    #  @param sequence (N,) sequence numbers
+    #  @param timestamp host time the batch was read
     
-    @pyqtSlot()
-    def receive(self):
-        while self.serial.canReadLine():
-            raw_input_data = self.serial.readLine().data().decode()
-            x_val, y_val, z_val = map(int, raw_input_data.rstrip("\r\n").split(","))
-            self.textedit_output.append(f"({x_val}, {y_val}, {z_val})")
-            pos = QVector3D(x_val, z_val, y_val)
-            self.graph_instance.add_new_item(pos)
-            
+    @pyqtSlot(object, object, float)
+    @hot_path
+    def receive(self, points, sequence, timestamp):
+        if TRACER.enabled:
+            TRACER.record("queue", time.time() - timestamp)
+        self.reader.stats.count_taken()
+        self.point_store.append(points, timestamp=timestamp, sequence=sequence)
+        self.textedit_output.append_points(points)
+        self.plot_points(points)
+
+    @pyqtSlot(object, object, float)
+    @hot_path
+    def receive_production(self, raw_input_data, sequence, timestamp):
+        self.reader.stats.count_taken()
+        self.plot_production(raw_input_data, sequence, timestamp)
 
-    @pyqtSlot()
-    def receive_production(self):
-        while self.serial.canReadLine():
-            # get the data
-            raw_input_data = self.serial.readLine().data().decode()
-            raw_input_data = list(map(int, raw_input_data.rstrip("\r\n").split(",")))
-            
-            # convert the data to be plotted on  a cartesian plot in 3D
-            phi = math.radians(raw_input_data[0])
-            theta = math.radians(raw_input_data[1])
-            distance = raw_input_data[2]
-            
-            x_val = distance * math.sin(theta) * math.cos(phi)
-            y_val = distance * math.sin(theta) * math.sin(phi)
-            z_val = distance * math.cos(theta)
-            
-            self.plotbank.append((x_val, z_val, y_val))
-            self.textedit_output.append(f"({x_val}, {y_val}, {z_val})")
-            
-            # send the point to be plotted
-            pos = QVector3D(x_val, z_val, y_val)
-            self.graph_instance.add_new_item(pos)
+    """
+    Method to take a batch of a replayed session, the production path without the live
+    reader's counters, replayed batches never went through its queue
+    """
+
+    @pyqtSlot(object, object, float)
+    def receive_replay(self, raw_input_data, sequence, timestamp):
+        self.plot_production(raw_input_data, sequence, timestamp)
+
+    @hot_path
+    def plot_production(self, raw_input_data, sequence, timestamp):
+        trace = TRACER.enabled
+        if trace:
+            TRACER.record("queue", time.time() - timestamp)
+            started = time.perf_counter()
+        # convert the data to be plotted on  a cartesian plot in 3D
+        points = self.transform.to_cartesian(raw_input_data)
+        if trace:
+            TRACER.record("transform", time.perf_counter() - started)
+        self.point_store.append(points, raw_input_data, timestamp, sequence)
+        self.textedit_output.append_points(points, "({:.3f}, {:.3f}, {:.3f})")
+
+        # send the points to be plotted
+        self.plot_points(points)
+
+    """
+    Method to hand new cartesian points to the live plot
+    in the full scan view they are picked up from the point store on the next refresh
+    #  @param self The object pointer
+    #  @param points (N, 3) x, y, z
+    """
+
+    def plot_points(self, points):
+        if self.lod_timer.isActive():
+            self.lod_dirty = True
+            return
+        # the graph's vertical axis is the second one, so y and z swap places
+        self.render_scheduler.submit(points[:, [0, 2, 1]])
 
     """
     Method to send commands via serial
@@ -274,9 +489,30 @@ class RealTimePlotterWidget(QWidget):
     @pyqtSlot()
     def send(self, msg):
         command = f'{msg}\r\n'
-        self.serial.write(command.encode())
+        self.reader.write(command.encode())
         self.textedit_output.append(f"[Sent] {command}")
         
+    """ 
+    # Method to pick the wire format spoken on the connection, ascii lines or binary frames
+    # @param self The object pointer
+    # """
+
+    @pyqtSlot(str)
+    def set_wire_format(self, wire_format):
+        self.wire_format = wire_format
+        self.reader.set_wire_format(wire_format)
+        self.textedit_output.append(f"Wire format: {wire_format}")
+
+    @pyqtSlot(str)
+    def set_baud_rate(self, text):
+        baud_rate = int(text.split()[0])
+        try:
+            self.reader.configure(baud_rate=baud_rate)
+        except ValueError as error:
+            self.textedit_output.append(f"Baud rate not changed: {error}")
+            return
+        self.textedit_output.append(f"Baud rate: {baud_rate}")
+
     """ 
     # Method to create a serial connection with the board
     # @param self The object pointer
@@ -290,11 +526,113 @@ class RealTimePlotterWidget(QWidget):
            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
         )
         if checked:
-            if not self.serial.isOpen():
-                if not self.serial.open(QIODevice.ReadWrite):
-                    self.button_connect.setChecked(False)
+            self.reader.open()
         else:
-            self.serial.close()
+            self.reader.close()
+
+    """ 
+    # Reported by the reader thread when the connection comes up or goes away, while
+    # connected the transport keeps retrying a dropped connection on its own
+    # @param self The object pointer
+    # """
+
+    @pyqtSlot(bool)
+    def on_connection_changed(self, connected):
+        if connected:
+            self.textedit_output.append("Connection up")
+        elif self.button_connect.isChecked():
+            self.textedit_output.append("Connection lost, retrying")
+
+    """ 
+    # Method to record every decoded record to disk, each recording is a new session
+    # directory of chunk files under RECORDING_DIRECTORY
+    # @param self The object pointer
+    # """
+
+    @pyqtSlot(bool)
+    def toggle_recording(self, checked):
+        self.button_record.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        self.button_record.setText("Stop Recording" if checked else "Record")
+        if checked:
+            directory = os.path.join(RECORDING_DIRECTORY, time.strftime("%Y%m%d-%H%M%S"))
+            try:
+                self.reader.start_recording(SessionRecorder(directory))
+            except OSError as error:
+                self.textedit_output.append(f"Can not record to {directory}: {error}")
+                self.button_record.setChecked(False)
+                return
+            self.textedit_output.append(f"Recording to {directory}")
+        else:
+            recorder = self.reader.stop_recording()
+            if recorder is not None:
+                self.textedit_output.append(
+                    f"Recording stopped, {recorder.records_dropped} records dropped"
+                    + (f", {recorder.error}" if recorder.error else "")
+                )
+
+    """ 
+    # Method to play a recorded session through the production ingest path, at the
+    # selected speed relative to the recording
+    # @param self The object pointer
+    # """
+
+    @pyqtSlot(bool)
+    def toggle_replay(self, checked):
+        if checked:
+            directory = QFileDialog.getExistingDirectory(self, "Replay Session", RECORDING_DIRECTORY)
+            self.replay = None
+            if directory:
+                try:
+                    self.replay = SessionReplay(directory, self.spinbox_replay_speed.value(), parent=self)
+                except (OSError, ValueError) as error:
+                    self.textedit_output.append(f"Can not replay {directory}: {error}")
+            if self.replay is None:
+                self.button_replay.setChecked(False)
+                return
+            self.replay.points_received.connect(self.receive_replay)
+            self.replay.finished.connect(lambda: self.button_replay.setChecked(False))
+            self.replay.start()
+            self.textedit_output.append(
+                f"Replaying {self.replay.records} records from {directory}"
+            )
+        elif self.replay is not None:
+            self.replay.stop()
+            self.textedit_output.append(f"Replay stopped after {self.replay.replayed} records")
+            self.replay.deleteLater()
+            self.replay = None
+        self.button_replay.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        self.button_replay.setText("Stop Replay" if checked else "Replay Session")
+
+    """ 
+    # Throughput and loss counters, refreshed a few times a second
+    # @param self The object pointer
+    # """
+
+    @pyqtSlot()
+    def refresh_stats(self):
+        self.lcd_plot_counter.display(self.graph_instance.scatter_proxy.itemCount())
+        self.label_stats.setText(self.reader.stats.report(self.render_scheduler.pending_count))
+        self.check_export()
+
+    def closeEvent(self, event):
+        self.watchdog.stop()
+        self.stats_timer.stop()
+        self.reader.stop_recording()
+        if self.replay is not None:
+            self.replay.stop()
+        self.reader.stop()
+        # the export and a full scan rebuild read the mapped segments closed below
+        if self.export is not None:
+            self.export.wait()
+        if self.lod_rebuild is not None:
+            self.lod_rebuild.wait()
+        if isinstance(self.point_store, MappedPointStore):
+            self.point_store.close()
+        super(RealTimePlotterWidget, self).closeEvent(event)
 
     """ 
     # Quick Scan 
@@ -307,7 +645,7 @@ class RealTimePlotterWidget(QWidget):
         self.quick_scan.show()
         self.quick_scan.setAttribute(Qt.WA_DeleteOnClose)
         # Output Command
-        self.serial.write(self.command_quick_scan.encode())
+        self.reader.write(self.command_quick_scan.encode())
 
     """ 
     # Deep Scan
@@ -320,7 +658,7 @@ class RealTimePlotterWidget(QWidget):
         self.deep_scan.show()
         self.deep_scan.setAttribute(Qt.WA_DeleteOnClose)
         # Output Command
-        self.serial.write(self.command_deep_scan.encode())
+        self.reader.write(self.command_deep_scan.encode())
 
     """ 
     # Custom Scan 
@@ -329,7 +667,7 @@ class RealTimePlotterWidget(QWidget):
     # """
 
     def button_custom_scan_click(self):
-        self.custom_scan = CustomScanWidget()
+        self.custom_scan = CustomScanWidget(self.reader)
 
         self.custom_scan.slider_azimuth_max.valueChanged.connect(
             self.custom_scan.azimuth_max_change
@@ -362,7 +700,7 @@ class RealTimePlotterWidget(QWidget):
         self.custom_scan.show()
         self.custom_scan.setAttribute(Qt.WA_DeleteOnClose)
         # Output Command
-        self.serial.write(self.command_custom_scan.encode())
+        self.reader.write(self.command_custom_scan.encode())
 
     """ 
     # Calibrate
@@ -375,7 +713,7 @@ class RealTimePlotterWidget(QWidget):
         self.quick_scan.show()
         self.quick_scan.setAttribute(Qt.WA_DeleteOnClose)
         # Output Command
-        self.serial.write(self.command_calibrate.encode())
+        self.reader.write(self.command_calibrate.encode())
 
     """ 
     # PTU Control
@@ -384,7 +722,7 @@ class RealTimePlotterWidget(QWidget):
     # """
 
     def button_ptu_control_click(self):
-        self.serial.write(self.command_h.encode())
+        self.reader.write(self.command_h.encode())
 
     """ 
     # Help?!
@@ -393,12 +731,48 @@ class RealTimePlotterWidget(QWidget):
     # """
 
     def button_help_click(self):
-        self.serial.write(self.command_d.encode())
+        self.reader.write(self.command_d.encode())
 
     def button_reset_plot_click(self):
+        self.render_scheduler.clear()
         self.graph_instance.reset_graph()
         print("Reset!")
         
+    """
+    Export the whole point store, not just what is on display, as binary PLY or PCD
+    """
+
+    def button_export_click(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Point Cloud", "scan.ply", "PLY (*.ply);;PCD (*.pcd)"
+        )
+        if not path:
+            return
+        try:
+            self.export = StoreExport(path, self.point_store)
+        except ValueError as error:
+            self.textedit_output.append(f"Export failed: {error}")
+            return
+        self.export.start()
+        self.button_export.setEnabled(False)
+        self.textedit_output.append(f"Exporting {self.export.total} points to {path}")
+
+    """
+    Report a finished export, polled with the stats
+    """
+
+    def check_export(self):
+        if self.export is None or self.export.is_running():
+            return
+        export, self.export = self.export, None
+        self.button_export.setEnabled(True)
+        if export.error is not None:
+            self.textedit_output.append(f"Export failed: {export.error}")
+        else:
+            self.textedit_output.append(
+                f"Exported {export.count} points to {export.path} in {export.seconds:.1f} s"
+            )
+
     @pyqtSlot(bool) 
     def toggle_rotation(self, checked):
         self.button_toggle_rotation.setStyleSheet(
@@ -411,4 +785,137 @@ class RealTimePlotterWidget(QWidget):
         if (checked):
             self.graph_instance.enable_rotation()
         else:
-            self.graph_instance.disable_rotation()
\ No newline at end of file
+            self.graph_instance.disable_rotation()
+
+    @pyqtSlot(bool)
+    def toggle_lod(self, checked):
+        self.button_toggle_lod.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        self.button_toggle_lod.setText("Live View" if checked else "Full Scan")
+
+        self.render_scheduler.clear()
+        if checked:
+            self.graph_instance.set_display_budget(None, None)
+            self.lod_zoom = self.graph_instance.zoom_level()
+            self.lod_dirty = True
+            self.refresh_lod()
+            self.lod_timer.start()
+        else:
+            self.lod_timer.stop()
+            self.lod_zoom_timer.stop()
+            self.graph_instance.reset_graph()
+            self.graph_instance.set_display_budget(*self.live_display_budget)
+
+    @pyqtSlot(float)
+    def on_zoom_changed(self, zoom):
+        if self.lod_timer.isActive():
+            self.lod_zoom_timer.start()
+
+    @pyqtSlot()
+    def on_zoom_settled(self):
+        self.lod_zoom = self.graph_instance.zoom_level()
+        self.lod_dirty = True
+        self.refresh_lod()
+
+    """
+    Redraw the full scan view from the point store, decimated to the render budget
+    for the current zoom level. Reading the whole store again runs on a thread, the
+    view keeps the last result until it is done
+    """
+
+    @pyqtSlot()
+    def refresh_lod(self):
+        if self.lod_rebuild is not None:
+            if self.lod_rebuild.is_running():
+                return
+            rebuild, self.lod_rebuild = self.lod_rebuild, None
+            if rebuild.error is not None:
+                self.textedit_output.append(f"Full scan failed: {rebuild.error}")
+                self.lod_dirty = False
+                return
+            self.lod.adopt(rebuild)
+            self.lod_dirty = True
+        if not self.lod_dirty:
+            return
+        if self.lod.needs_rebuild(self.point_store, self.lod_zoom):
+            self.lod_rebuild = self.lod.rebuild(self.point_store, self.lod_zoom)
+            self.lod_rebuild.start()
+            return
+        self.lod_dirty = False
+        reduced = self.lod.update(self.point_store)
+        self.graph_instance.set_items(reduced[:, [0, 2, 1]])
+
+    """
+    Latency tracing, timestamps are taken at every stage from the serial read to the frame
+    render while enabled and summarised as rolling percentiles
+    """
+
+    @pyqtSlot(bool)
+    def toggle_tracing(self, checked):
+        self.button_toggle_tracing.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        if checked:
+            TRACER.clear()
+        TRACER.enabled = checked
+        # fps measurement makes Q3DScatter render continuously, only pay for it while tracing
+        self.graph_instance.set_measure_fps(checked)
+        self.label_trace.setVisible(checked)
+        if checked:
+            self.trace_timer.start()
+        else:
+            self.trace_timer.stop()
+
+    @pyqtSlot()
+    def refresh_trace(self):
+        frame_time = self.graph_instance.frame_time()
+        if frame_time:
+            TRACER.record("render", frame_time)
+        self.label_trace.setText(TRACER.report())
+
+    def button_dump_trace_click(self):
+        try:
+            TRACER.dump(TRACE_REPORT_FILE)
+        except OSError as error:
+            self.textedit_output.append(f"Latency report not written: {error}\n{TRACER.report()}")
+            return
+        self.textedit_output.append(f"Latency report written to {TRACE_REPORT_FILE}\n{TRACER.report()}")
+
+    """
+    Hot path profiling, receive, add_items and rotate_x_axis run under cProfile while
+    enabled, the stats are written out when it is switched off
+    """
+
+    @pyqtSlot(bool)
+    def toggle_profiler(self, checked):
+        self.button_toggle_profiler.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        if checked:
+            PROFILER.start()
+        else:
+            try:
+                PROFILER.stop(PROFILE_REPORT_FILE)
+            except OSError as error:
+                self.textedit_output.append(f"Profile not written: {error}")
+                return
+            self.textedit_output.append(f"Profile written to {PROFILE_REPORT_FILE}")
+
+    @pyqtSlot(bool)
+    def toggle_watchdog(self, checked):
+        self.button_toggle_watchdog.setStyleSheet(
+            STYLE_BUTTON_TOGGLED_ON if checked else STYLE_BUTTON_TOGGLED_OFF
+        )
+        if checked:
+            self.watchdog.start()
+        else:
+            self.watchdog.stop()
+            self.textedit_output.append(
+                f"[Watchdog] {self.watchdog.stalls} stalls, longest {self.watchdog.max_lag * 1000:.0f} ms"
+            )
+
+    @pyqtSlot(float, str)
+    def on_stalled(self, seconds, stack):
+        message = f"[Watchdog] event loop stalled for {seconds * 1000:.0f} ms"
+        self.textedit_output.append(f"{message}\n{stack.rstrip()}" if stack else message)
@@ -0,0 +1,207 @@
+"""
+Recorder
+Records every decoded record with the host time it was read to append-only binary files.
+
+The reader thread only hands each batch to a bounded queue with put_nowait, a background
+writer thread packs the batches into RECORD_DTYPE records, gathers them into large
+sequential writes and fsyncs on an interval. When the disk can not keep up the queue
+fills and further batches are dropped and counted, ingest never waits on the disk.
+
+A session is a directory of numbered chunk files, a new chunk is started once the current
+one reaches chunk_size bytes. Every chunk starts with a HEADER_DTYPE header:
+
+    offset  size  field
+    0       6     magic b"RTPREC"
+    6       2     format version, uint16
+    8       4     record size in bytes, uint32
+    12      4     chunk number, uint32
+
+followed by the records, little-endian:
+
+    0       8     host timestamp of the read, float64 seconds since the epoch
+    8       8     sequence number, int64
+    16      24    three float64 values as decoded (x, y, z or azimuth, elevation, distance)
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+RECORD_MAGIC = b"RTPREC"
+RECORD_VERSION = 1
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S6"),
+        ("version", "<u2"),
+        ("record_size", "<u4"),
+        ("chunk", "<u4"),
+    ]
+)
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("sequence", "<i8"),
+        ("values", "<f8", (3,)),
+    ]
+)
+CHUNK_NAME = "chunk-{:05d}.rec"
+
+RECORDING_DIRECTORY = "recordings"
+RECORD_QUEUE_BATCHES = 4096
+RECORD_WRITE_SIZE = 1 << 20
+RECORD_CHUNK_SIZE = 256 << 20
+RECORD_FSYNC_INTERVAL = 1.0
+
+
+def chunk_paths(directory):
+    """ chunk files of a session in recording order """
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith("chunk-") and name.endswith(".rec")
+    ]
+
+
+def chunk_header(chunk):
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = RECORD_MAGIC
+    header["version"] = RECORD_VERSION
+    header["record_size"] = RECORD_DTYPE.itemsize
+    header["chunk"] = chunk
+    return header.tobytes()
+
+
+class SessionRecorder:
+    """
+    @param directory session directory, created on start()
+    @param fsync_interval seconds between fsyncs, None leaves it to the OS
+    """
+
+    def __init__(
+        self,
+        directory,
+        queue_batches=RECORD_QUEUE_BATCHES,
+        write_size=RECORD_WRITE_SIZE,
+        chunk_size=RECORD_CHUNK_SIZE,
+        fsync_interval=RECORD_FSYNC_INTERVAL,
+    ):
+        self.directory = directory
+        self.queue = queue.Queue(maxsize=queue_batches)
+        self.write_size = write_size
+        self.chunk_size = chunk_size
+        self.fsync_interval = fsync_interval
+        self.thread = None
+        self.records_written = 0
+        self.records_dropped = 0
+        self.bytes_written = 0
+        self.chunks = 0
+        self.error = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="session-recorder")
+        self.thread.start()
+
+    def write(self, values, sequence, timestamp):
+        """
+        Queue a decoded batch, safe to call from any thread and never blocks.
+        @return False when the batch had to be dropped
+        """
+        try:
+            self.queue.put_nowait((values, sequence, timestamp))
+        except queue.Full:
+            self.records_dropped += len(values)
+            return False
+        return True
+
+    def stop(self, wait=True):
+        """
+        Finish writing what is queued and close the files. With wait=False the writer
+        thread does that on its own and stop() returns at once.
+        """
+        if self.thread is None:
+            return
+        # called from the GUI thread, so never block: when the writer is behind and the
+        # queue is full the oldest batch makes room for the end marker and counts as dropped
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                break
+            except queue.Full:
+                try:
+                    batch = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if batch is not None:
+                    self.records_dropped += len(batch[0])
+        if wait:
+            self.thread.join()
+
+    def is_recording(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        output = None
+        pending = []
+        pending_bytes = 0
+        synced_at = time.monotonic()
+        try:
+            while True:
+                try:
+                    batch = self.queue.get(timeout=self.fsync_interval or RECORD_FSYNC_INTERVAL)
+                    idle = False
+                except queue.Empty:
+                    batch = None
+                    idle = True
+                finished = batch is None and not idle
+
+                if batch is not None:
+                    values, sequence, timestamp = batch
+                    records = np.empty(len(values), dtype=RECORD_DTYPE)
+                    records["timestamp"] = timestamp
+                    records["sequence"] = sequence
+                    records["values"] = values
+                    pending.append(records.tobytes())
+                    pending_bytes += records.nbytes
+
+                # write in large blocks, or whatever there is once the stream goes quiet
+                if pending and (idle or finished or pending_bytes >= self.write_size):
+                    if output is None or output.tell() >= self.chunk_size:
+                        output = self._next_chunk(output)
+                    output.write(b"".join(pending))
+                    self.records_written += pending_bytes // RECORD_DTYPE.itemsize
+                    self.bytes_written += pending_bytes
+                    pending = []
+                    pending_bytes = 0
+
+                if output is not None and self.fsync_interval is not None and (
+                    finished or time.monotonic() - synced_at >= self.fsync_interval
+                ):
+                    output.flush()
+                    os.fsync(output.fileno())
+                    synced_at = time.monotonic()
+
+                if finished:
+                    break
+        except OSError as error:
+            # keep the reason for the GUI, everything queued from here on is discarded
+            self.error = error
+            while self.queue.get() is not None:
+                pass
+        finally:
+            if output is not None:
+                output.close()
+
+    def _next_chunk(self, output):
+        if output is not None:
+            output.flush()
+            if self.fsync_interval is not None:
+                os.fsync(output.fileno())
+            output.close()
+        output = open(os.path.join(self.directory, CHUNK_NAME.format(self.chunks)), "wb")
+        output.write(chunk_header(self.chunks))
+        self.chunks += 1
+        return output
@@ -0,0 +1,71 @@
+"""
+RenderScheduler
+Collects incoming points and hands them to the Plotter at most once per frame, so the
+scatter proxy sees one batched update per frame no matter how fast points arrive.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from realtimeplotter.tracing import TRACER
+
+
+RENDER_RATE = 30
+
+
+class RenderScheduler(QObject):
+    """
+    Points passed to submit() are queued until the next frame tick, then pushed to the
+    plotter with a single add_items call. The timer only runs while points are waiting.
+    """
+
+    flushed = pyqtSignal(int)
+
+    def __init__(self, plotter, rate=RENDER_RATE, parent=None):
+        super(RenderScheduler, self).__init__(parent)
+        self.plotter = plotter
+        self.pending = []
+        self.pending_count = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self.timer.setInterval(int(1000 / rate))
+
+    def submit(self, points):
+        """
+        Queue an (N, 3) array of graph coordinates for the next frame.
+        """
+        if not len(points):
+            return
+        self.pending.append(points)
+        self.pending_count += len(points)
+        if not self.timer.isActive():
+            self.submitted_at = time.perf_counter()
+            self.timer.start()
+
+    def clear(self):
+        self.timer.stop()
+        self.pending = []
+        self.pending_count = 0
+
+    @pyqtSlot()
+    def flush(self):
+        if not self.pending:
+            return
+        points = self.pending[0] if len(self.pending) == 1 else np.concatenate(self.pending)
+        self.pending = []
+        self.pending_count = 0
+        if TRACER.enabled:
+            TRACER.record("schedule", time.perf_counter() - self.submitted_at)
+            started = time.perf_counter()
+            self.plotter.add_items(points)
+            TRACER.record("insert", time.perf_counter() - started)
+        else:
+            self.plotter.add_items(points)
+        self.flushed.emit(len(points))
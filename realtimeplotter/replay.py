@@ -0,0 +1,156 @@
+"""
+Replay
+Plays a session written by the SessionRecorder back into the live pipeline.
+
+The chunk files are memory mapped, opening a session only reads the headers and the pages
+of a chunk are loaded as playback reaches them, so a recording of any size starts at once.
+Records are replayed in the read batches they were recorded in (records sharing a host
+timestamp), capped at batch_size records.
+
+speed 1.0 replays in real time, 10.0 ten times faster and REPLAY_MAX_SPEED (0) as fast as
+the receiver keeps up. In the GUI a timer emits points_received, with the same signature
+as SerialReader.points_received, so a replay connects to the same slots. Headless code
+iterates batches() or calls run() instead.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal, pyqtSlot
+
+from realtimeplotter.recorder import (
+    HEADER_DTYPE,
+    RECORD_DTYPE,
+    RECORD_MAGIC,
+    RECORD_VERSION,
+    chunk_paths,
+)
+
+
+REPLAY_MAX_SPEED = 0
+REPLAY_BATCH_SIZE = 10_000
+REPLAY_WINDOW = 1 << 16
+REPLAY_TICK = 5
+
+
+def open_session(directory):
+    """
+    @return a read only memmap of RECORD_DTYPE records for every chunk of the session
+    """
+    chunks = []
+    for path in chunk_paths(directory):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if (
+            len(header) != 1
+            or header["magic"][0] != RECORD_MAGIC
+            or header["version"][0] != RECORD_VERSION
+            or header["record_size"][0] != RECORD_DTYPE.itemsize
+        ):
+            raise ValueError(f"{path} is not a recording chunk")
+        records = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_DTYPE.itemsize)
+        # a chunk cut short by a crash can end in a partial record
+        count = len(records) // RECORD_DTYPE.itemsize
+        chunks.append(records[:count * RECORD_DTYPE.itemsize].view(RECORD_DTYPE))
+    return chunks
+
+
+class SessionReplay(QObject):
+    """
+    @param speed playback speed relative to the recording, REPLAY_MAX_SPEED for no pacing
+    """
+
+    # values (N, 3), sequence (N,), host timestamp of the emit
+    points_received = pyqtSignal(object, object, float)
+    finished = pyqtSignal()
+
+    def __init__(self, directory, speed=1.0, batch_size=REPLAY_BATCH_SIZE, parent=None):
+        super(SessionReplay, self).__init__(parent)
+        self.directory = directory
+        self.chunks = open_session(directory)
+        self.speed = speed
+        self.batch_size = batch_size
+        self.records = sum(len(chunk) for chunk in self.chunks)
+        self.replayed = 0
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(REPLAY_TICK)
+        self.timer.timeout.connect(self.tick)
+        self.pending = None
+
+    def duration(self):
+        """ seconds between the first and the last record """
+        chunks = [chunk for chunk in self.chunks if len(chunk)]
+        if not chunks:
+            return 0.0
+        return float(chunks[-1]["timestamp"][-1] - chunks[0]["timestamp"][0])
+
+    def batches(self):
+        """
+        Yield (values, sequence, recorded timestamp) for every read batch of the session.
+        Only REPLAY_WINDOW records are looked at at a time.
+        """
+        for chunk in self.chunks:
+            for start in range(0, len(chunk), REPLAY_WINDOW):
+                window = chunk[start:start + REPLAY_WINDOW]
+                timestamps = window["timestamp"]
+                edges = np.flatnonzero(timestamps[1:] != timestamps[:-1]) + 1
+                bounds = np.concatenate(([0], edges, [len(window)]))
+                for first, last in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                    for offset in range(first, last, self.batch_size):
+                        batch = window[offset:min(offset + self.batch_size, last)]
+                        yield (
+                            np.array(batch["values"]),
+                            np.array(batch["sequence"]),
+                            float(batch["timestamp"][0]),
+                        )
+
+    def run(self, sink):
+        """
+        Headless replay on the calling thread, sink(values, sequence, timestamp) is called
+        for every batch at the replay speed. @return records replayed
+        """
+        started = time.perf_counter()
+        first = None
+        for values, sequence, recorded in self.batches():
+            if first is None:
+                first = recorded
+            if self.speed:
+                delay = (recorded - first) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            sink(values, sequence, time.time())
+            self.replayed += len(values)
+        return self.replayed
+
+    def start(self):
+        self.iterator = self.batches()
+        self.pending = next(self.iterator, None)
+        self.first = None if self.pending is None else self.pending[2]
+        self.started = time.perf_counter()
+        self.replayed = 0
+        # unpaced, tick whenever the event loop is idle so rendering still gets its turn
+        self.timer.setInterval(REPLAY_TICK if self.speed else 0)
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    @pyqtSlot()
+    def tick(self):
+        """ emit every batch that is due, at max speed one batch per tick """
+        elapsed = time.perf_counter() - self.started
+        while self.pending is not None:
+            values, sequence, recorded = self.pending
+            if self.speed and (recorded - self.first) / self.speed > elapsed:
+                return
+            self.points_received.emit(values, sequence, time.time())
+            self.replayed += len(values)
+            self.pending = next(self.iterator, None)
+            if not self.speed:
+                break
+        if self.pending is None:
+            self.timer.stop()
+            self.finished.emit()
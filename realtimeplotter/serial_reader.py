@@ -0,0 +1,205 @@
+"""
+SerialReader
+Reads the connection on its own thread so a slow frame in the graph never holds up
+ingest. The worker owns the transport (a serial port by default, see
+realtimeplotter.transports for the others), decodes everything it reads in batches and
+hands the decoded points to the GUI thread through a queued signal.
+
+Reads are driven by the transport's ready_read only, an idle connection costs nothing.
+Each wakeup drains at most READ_BYTE_BUDGET bytes or READ_TIME_BUDGET seconds of work,
+whatever is left is picked up by a zero delay timer so writes, stops and format changes
+queued for the reader thread get their turn in between and the GUI gets batches of a
+bounded size.
+"""
+import time
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from realtimeplotter.protocol import WIRE_FORMAT_ASCII, make_decoder
+from realtimeplotter.stats import IngestStats, decoder_counts
+from realtimeplotter.tracing import TRACER
+from realtimeplotter.transports import check_options, create_transport, split_spec
+
+
+READ_BYTE_BUDGET = 1 << 20
+READ_TIME_BUDGET = 0.010
+
+
+class SerialReaderWorker(QObject):
+    """
+    Lives on the reader thread. Every slot here runs on that thread, the GUI only
+    talks to it through queued signals.
+    """
+
+    # values (N, 3), sequence (N,), host timestamp of the read
+    points_received = pyqtSignal(object, object, float)
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, port_name, wire_format=WIRE_FORMAT_ASCII, stats=None, limits=None):
+        super(SerialReaderWorker, self).__init__()
+        # a transport spec, a plain port name is a serial port
+        self.port_name = port_name
+        # records outside these ((low, high), ...) are rejected, see make_decoder
+        self.limits = limits
+        self.decoder = make_decoder(wire_format, limits)
+        self.stats = IngestStats() if stats is None else stats
+        # a SessionRecorder, set and cleared from the GUI thread
+        self.recorder = None
+        self.transport = None
+        self.connected = False
+        self.resume_pending = False
+
+    @pyqtSlot()
+    def start(self):
+        # created here so the transport belongs to the reader thread
+        self.transport = create_transport(self.port_name, self)
+        self.transport.ready_read.connect(self.read)
+        self.transport.connection_changed.connect(self.on_connection_changed)
+
+    @pyqtSlot()
+    def open(self):
+        self.transport.open()
+
+    @pyqtSlot(bool)
+    def on_connection_changed(self, connected):
+        # a fresh connection, or a reconnect, starts a new stream
+        if connected and not self.connected:
+            self.decoder.reset()
+        self.connected = connected
+        self.connection_changed.emit(connected)
+
+    @pyqtSlot()
+    def close(self):
+        self.transport.close()
+
+    @pyqtSlot()
+    def stop(self):
+        self.transport.close()
+
+    @pyqtSlot(bytes)
+    def write(self, data):
+        self.transport.write(data)
+
+    @pyqtSlot(str)
+    def set_wire_format(self, wire_format):
+        self.decoder = make_decoder(wire_format, self.limits)
+
+    @pyqtSlot(object)
+    def configure(self, options):
+        self.transport.configure(**options)
+
+    @pyqtSlot()
+    def read(self):
+        self.stats.wakeups += 1
+        deadline = time.perf_counter() + READ_TIME_BUDGET
+        budget = READ_BYTE_BUDGET
+        while budget > 0 and self.transport.bytes_available():
+            budget -= self.ingest(budget)
+            if time.perf_counter() > deadline:
+                break
+        if self.transport.bytes_available() and not self.resume_pending:
+            self.resume_pending = True
+            QTimer.singleShot(0, self.resume)
+
+    @pyqtSlot()
+    def resume(self):
+        self.resume_pending = False
+        self.read()
+
+    def ingest(self, max_bytes):
+        """ read, decode and hand on at most max_bytes, @return bytes read """
+        trace = TRACER.enabled
+        if trace:
+            started = time.perf_counter()
+        data = self.transport.read(max_bytes)
+        timestamp = time.time()
+        if trace:
+            read_at = time.perf_counter()
+            TRACER.record("read", read_at - started)
+        before = decoder_counts(self.decoder)
+        values, sequence = self.decoder.feed(data)
+        if trace:
+            TRACER.record("parse", time.perf_counter() - read_at)
+        self.stats.count_read(len(data), len(values), self.decoder, before)
+        if len(values):
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.write(values, sequence, timestamp)
+            self.points_received.emit(values, sequence, timestamp)
+        return len(data)
+
+
+class SerialReader(QObject):
+    """
+    GUI side handle of the reader thread.
+    Calls made here are forwarded to the worker as queued signals and return at once.
+    """
+
+    open_requested = pyqtSignal()
+    close_requested = pyqtSignal()
+    stop_requested = pyqtSignal()
+    write_requested = pyqtSignal(bytes)
+    wire_format_requested = pyqtSignal(str)
+    configure_requested = pyqtSignal(object)
+
+    def __init__(self, port_name, wire_format=WIRE_FORMAT_ASCII, parent=None, limits=None):
+        super(SerialReader, self).__init__(parent)
+        # the transport is created on the reader thread, a bad spec has to fail here
+        self.scheme, _, options = split_spec(port_name)
+        check_options(self.scheme, options)
+        self.thread = QThread()
+        self.stats = IngestStats()
+        self.worker = SerialReaderWorker(port_name, wire_format, self.stats, limits)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.start)
+        self.open_requested.connect(self.worker.open)
+        self.close_requested.connect(self.worker.close)
+        self.stop_requested.connect(self.worker.stop)
+        self.write_requested.connect(self.worker.write)
+        self.wire_format_requested.connect(self.worker.set_wire_format)
+        self.configure_requested.connect(self.worker.configure)
+
+        self.points_received = self.worker.points_received
+        self.connection_changed = self.worker.connection_changed
+        self.thread.start()
+
+    def open(self):
+        self.open_requested.emit()
+
+    def close(self):
+        self.close_requested.emit()
+
+    def write(self, data):
+        self.write_requested.emit(data)
+
+    def set_wire_format(self, wire_format):
+        self.wire_format_requested.emit(wire_format)
+
+    def configure(self, **options):
+        """
+        change the transport settings, e.g. baud_rate=115200 for a serial port.
+        Settings the transport would refuse raise ValueError here.
+        """
+        check_options(self.scheme, options)
+        self.configure_requested.emit(options)
+
+    def start_recording(self, recorder):
+        """ record everything decoded from now on, the recorder is started here """
+        recorder.start()
+        self.worker.recorder = recorder
+
+    def stop_recording(self):
+        """
+        Stop the running recording, its writer thread finishes the files in the
+        background. @return the recorder or None
+        """
+        recorder, self.worker.recorder = self.worker.recorder, None
+        if recorder is not None:
+            recorder.stop(wait=False)
+        return recorder
+
+    def stop(self):
+        self.stop_requested.emit()
+        self.thread.quit()
+        self.thread.wait()
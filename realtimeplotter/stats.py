@@ -0,0 +1,122 @@
+"""
+Stats
+Throughput and loss counters for the ingest pipeline, from the bytes read off the
+connection to the points handed to the graph.
+
+Every counter has a single writer. The reader thread counts what it reads and decodes,
+the GUI thread counts what it takes in and plots, so the increments need no lock. The
+display takes a snapshot a few times a second, the rates are worked out between two
+snapshots rather than per batch.
+
+    bytes_received   bytes read from the connection
+    points_received  records decoded
+    parse_errors     records the decoder rejected (bad lines, frames failing the CRC)
+    dropped_bytes    bytes skipped while looking for the next frame (binary only)
+    sequence_gaps    records missing from the sequence numbers (binary only)
+    lost             records that never made it, the sequence gaps where the wire format
+                     has sequence numbers (a frame failing its CRC is a gap as well), the
+                     rejected records where it has not
+    queue_depth      batches emitted by the reader the GUI has not taken yet
+    points_pending   points waiting in the RenderScheduler for the next frame
+    points_plotted   points handed to the graph
+    wakeups          times the reader thread woke up to read
+"""
+import time
+
+
+STATS_REFRESH_INTERVAL = 250
+
+
+class IngestStats:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.bytes_received = 0
+        self.points_received = 0
+        self.parse_errors = 0
+        self.dropped_bytes = 0
+        self.sequence_gaps = 0
+        self.lost = 0
+        self.batches_emitted = 0
+        self.batches_taken = 0
+        self.points_plotted = 0
+        self.wakeups = 0
+        self.rate_at = time.perf_counter()
+        self.rate_totals = (0, 0, 0, 0)
+
+    def count_read(self, nbytes, points, decoder, before):
+        """
+        Reader thread, after a read has been decoded.
+        @param before decoder_counts(decoder) taken before the bytes were fed
+        """
+        rejected, dropped_bytes, sequence_gaps = decoder_counts(decoder)
+        self.bytes_received += nbytes
+        self.points_received += points
+        self.parse_errors += rejected - before[0]
+        self.dropped_bytes += dropped_bytes - before[1]
+        self.sequence_gaps += sequence_gaps - before[2]
+        if decoder.sequenced:
+            self.lost += sequence_gaps - before[2]
+        else:
+            self.lost += rejected - before[0]
+        if points:
+            self.batches_emitted += 1
+
+    def count_taken(self):
+        """ GUI thread, a batch emitted by the reader has arrived """
+        self.batches_taken += 1
+
+    def count_plotted(self, points):
+        """ GUI thread, points handed to the graph """
+        self.points_plotted += points
+
+    def snapshot(self, points_pending=0):
+        """
+        @return the totals plus bytes, points and plotted per second since the
+        previous snapshot
+        """
+        now = time.perf_counter()
+        totals = (self.bytes_received, self.points_received, self.points_plotted, self.wakeups)
+        elapsed = max(now - self.rate_at, 1e-9)
+        rates = [(total - previous) / elapsed for total, previous in zip(totals, self.rate_totals)]
+        self.rate_at = now
+        self.rate_totals = totals
+        return {
+            "bytes_received": self.bytes_received,
+            "points_received": self.points_received,
+            "parse_errors": self.parse_errors,
+            "dropped_bytes": self.dropped_bytes,
+            "sequence_gaps": self.sequence_gaps,
+            "lost": self.lost,
+            "queue_depth": max(self.batches_emitted - self.batches_taken, 0),
+            "points_pending": points_pending,
+            "points_plotted": self.points_plotted,
+            "bytes_per_sec": rates[0],
+            "points_per_sec": rates[1],
+            "plotted_per_sec": rates[2],
+            "wakeups": self.wakeups,
+            "wakeups_per_sec": rates[3],
+        }
+
+    def report(self, points_pending=0):
+        stats = self.snapshot(points_pending)
+        return "\n".join(
+            [
+                f"{'received':<10}{stats['points_received']:>12,}{stats['points_per_sec']:>12,.0f}/s",
+                f"{'bytes':<10}{stats['bytes_received']:>12,}{stats['bytes_per_sec']:>12,.0f}/s",
+                f"{'plotted':<10}{stats['points_plotted']:>12,}{stats['plotted_per_sec']:>12,.0f}/s",
+                f"{'lost':<10}{stats['lost']:>12,}",
+                f"{'  errors':<10}{stats['parse_errors']:>12,}",
+                f"{'  gaps':<10}{stats['sequence_gaps']:>12,}",
+                f"{'  skipped':<10}{stats['dropped_bytes']:>12,} bytes",
+                f"{'queued':<10}{stats['queue_depth']:>12,} batches",
+                f"{'pending':<10}{stats['points_pending']:>12,} points",
+                f"{'wakeups':<10}{stats['wakeups']:>12,}{stats['wakeups_per_sec']:>12,.0f}/s",
+            ]
+        )
+
+
+def decoder_counts(decoder):
+    """ the running loss counters every decoder keeps """
+    return decoder.rejected, decoder.dropped_bytes, decoder.sequence_gaps
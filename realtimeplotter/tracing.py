@@ -0,0 +1,85 @@
+"""
+Tracing
+Per-stage latency tracing from serial bytes to rendered points.
+
+Call sites guard every measurement with TRACER.enabled, so with tracing off a stage
+costs one attribute lookup. With tracing on each stage keeps its latest durations in a
+fixed size ring, the rolling p50/p95/p99 are worked out on demand.
+
+stages, in pipeline order
+    read        readAll on the reader thread
+    parse       decoding the bytes read
+    queue       from the end of the read until the GUI thread picks the batch up,
+                parse included
+    transform   spherical to cartesian conversion (production data only)
+    schedule    waiting in the RenderScheduler for the next frame
+    insert      Plotter.add_items, building items and updating the proxy
+    render      Q3DScatter frame time, from its own fps measurement
+"""
+import json
+import threading
+import time
+
+import numpy as np
+
+
+STAGES = ("read", "parse", "queue", "transform", "schedule", "insert", "render")
+TRACE_WINDOW = 4096
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyTracer:
+    def __init__(self, window=TRACE_WINDOW):
+        self.enabled = False
+        self.window = window
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.samples = {stage: np.zeros(self.window) for stage in STAGES}
+            self.counts = dict.fromkeys(STAGES, 0)
+
+    def record(self, stage, seconds):
+        """ store one duration, stages are recorded from the reader and the GUI thread """
+        with self.lock:
+            count = self.counts[stage]
+            self.samples[stage][count % self.window] = seconds * 1000
+            self.counts[stage] = count + 1
+
+    def percentiles(self):
+        """
+        @return {stage: {"count": n, "p50": ms, "p95": ms, "p99": ms}} for every stage
+        with samples
+        """
+        summary = {}
+        with self.lock:
+            for stage in STAGES:
+                count = self.counts[stage]
+                if not count:
+                    continue
+                values = np.percentile(self.samples[stage][:min(count, self.window)], PERCENTILES)
+                summary[stage] = {"count": count}
+                summary[stage].update(
+                    {f"p{percentile}": float(value) for percentile, value in zip(PERCENTILES, values)}
+                )
+        return summary
+
+    def report(self):
+        lines = [f"{'stage':<10}{'count':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+        for stage, row in self.percentiles().items():
+            lines.append(
+                f"{stage:<10}{row['count']:>9}{row['p50']:>9.2f}{row['p95']:>9.2f}{row['p99']:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w") as output:
+            json.dump(
+                {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": self.percentiles()},
+                output,
+                indent=2,
+            )
+
+
+TRACER = LatencyTracer()
@@ -0,0 +1,56 @@
+"""
+Transform
+Batched spherical to cartesian conversion for the production data stream.
+
+The PTU reports azimuth and elevation in whole degrees and the same angles come round on
+every sweep, so sin and cos are looked up in tables built once over the angle domain
+instead of being evaluated for every point.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+ANGLE_RESOLUTION = 1.0
+
+
+@lru_cache(maxsize=None)
+def trig_tables(resolution=ANGLE_RESOLUTION):
+    """
+    sin and cos of every angle in [0, 360) degrees at the given resolution.
+    """
+    steps = int(round(360.0 / resolution))
+    angles = np.radians(np.arange(steps) * resolution)
+    return np.sin(angles), np.cos(angles)
+
+
+class SphericalTransform:
+    """
+    Converts (azimuth, elevation, distance) rows to (x, y, z) with the same convention
+    receive_production has always used: phi is the azimuth, theta the elevation.
+    Angles are rounded to the table resolution, a whole degree by default.
+    """
+
+    def __init__(self, resolution=ANGLE_RESOLUTION):
+        self.resolution = resolution
+        self.sin_table, self.cos_table = trig_tables(resolution)
+        self.steps = len(self.sin_table)
+
+    def index(self, degrees):
+        return np.rint(np.asarray(degrees) / self.resolution).astype(np.int64) % self.steps
+
+    def to_cartesian(self, raw):
+        """
+        @param raw (N, 3) azimuth, elevation in degrees and distance
+        @return (N, 3) x, y, z
+        """
+        phi = self.index(raw[:, 0])
+        theta = self.index(raw[:, 1])
+        distance = raw[:, 2]
+
+        points = np.empty((len(raw), 3))
+        radial = distance * self.sin_table[theta]
+        points[:, 0] = radial * self.cos_table[phi]
+        points[:, 1] = radial * self.sin_table[phi]
+        points[:, 2] = distance * self.cos_table[theta]
+        return points
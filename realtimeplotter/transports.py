@@ -0,0 +1,540 @@
+"""
+Transports
+Byte sources and sinks behind one batched read interface, so the decoding and plotting
+pipeline does not care whether the data comes over a serial port or the network.
+
+A transport is picked with a spec string:
+
+    COM5, /dev/ttyUSB0, serial:COM5   serial port
+    tcp://host:port                   TCP client, e.g. a sensor head on Ethernet
+    tcp-listen://host:port            TCP server, one client at a time (simulator side)
+    udp://host:port                   UDP socket bound to host:port, writes go to peer
+                                      until a datagram arrives, then back to its sender
+    unix:/path/to/socket              Unix domain socket client (QLocalSocket)
+    unix-listen:/path/to/socket       Unix domain socket server
+    file:/path/to/capture             raw bytes read from a file in chunks
+
+Options follow a "?" as a query string:
+
+    baud=115200       serial baud rate, any of STANDARD_BAUD_RATES or a custom rate
+    flow=hardware     serial flow control, none, hardware (RTS/CTS) or software (XON/XOFF)
+    buffer=65536      bytes Qt buffers for the connection before it stops reading
+    peer=host:port    where a udp socket sends before it has heard from anyone
+
+    e.g. COM5?baud=921600&flow=hardware&buffer=1048576
+
+Every transport emits ready_read when bytes are waiting, read() hands back everything
+buffered (or at most max_bytes) in one go. Qt buffers up to read_buffer_size bytes per
+connection. connection_changed reports the connection coming up or going away, a
+transport that drops while it is meant to be open retries with a growing delay until
+close() is called.
+"""
+import os
+from urllib.parse import parse_qsl
+
+from PyQt5 import QtSerialPort
+from PyQt5.QtCore import QObject, QIODevice, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtNetwork import (
+    QAbstractSocket,
+    QHostAddress,
+    QLocalServer,
+    QLocalSocket,
+    QTcpServer,
+    QTcpSocket,
+    QUdpSocket,
+)
+
+
+READ_BUFFER_SIZE = 4 << 20
+BAUD_RATE = 9600
+STANDARD_BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600)
+FLOW_NONE = "none"
+FLOW_HARDWARE = "hardware"
+FLOW_SOFTWARE = "software"
+FLOW_CONTROLS = {
+    FLOW_NONE: QtSerialPort.QSerialPort.NoFlowControl,
+    FLOW_HARDWARE: QtSerialPort.QSerialPort.HardwareControl,
+    FLOW_SOFTWARE: QtSerialPort.QSerialPort.SoftwareControl,
+}
+RECONNECT_INTERVAL = 500
+RECONNECT_INTERVAL_MAX = 8000
+FILE_CHUNK_SIZE = 1 << 16
+
+TRANSPORT_SERIAL = "serial"
+TRANSPORT_TCP = "tcp"
+TRANSPORT_TCP_LISTEN = "tcp-listen"
+TRANSPORT_UDP = "udp"
+TRANSPORT_UNIX = "unix"
+TRANSPORT_UNIX_LISTEN = "unix-listen"
+TRANSPORT_FILE = "file"
+TRANSPORT_SCHEMES = (
+    TRANSPORT_SERIAL,
+    TRANSPORT_TCP,
+    TRANSPORT_TCP_LISTEN,
+    TRANSPORT_UDP,
+    TRANSPORT_UNIX,
+    TRANSPORT_UNIX_LISTEN,
+    TRANSPORT_FILE,
+)
+
+
+class Transport(QObject):
+    """
+    Base class, subclasses provide _open(), _close(), bytes_available(), read() and
+    write(), and report the outcome of _open() with _connected() or _failed().
+    """
+
+    ready_read = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, read_buffer_size=READ_BUFFER_SIZE, reconnect=True, parent=None):
+        super(Transport, self).__init__(parent)
+        self.read_buffer_size = read_buffer_size
+        self.reconnect = reconnect
+        self.wanted = False
+        self.connected = False
+        self.retrying = False
+        self.reconnects = 0
+        self.reconnect_delay = RECONNECT_INTERVAL
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.timeout.connect(self.retry)
+
+    def open(self):
+        self.wanted = True
+        if self.connected:
+            self.connection_changed.emit(True)
+            return
+        self.reconnect_timer.stop()
+        self.retrying = False
+        self._open()
+
+    def close(self):
+        self.wanted = False
+        self.retrying = False
+        self.reconnect_timer.stop()
+        self._close()
+        self.connected = False
+        self.connection_changed.emit(False)
+
+    def is_open(self):
+        return self.connected
+
+    def configure(self, read_buffer_size=None):
+        """ change the connection settings, an open connection keeps running """
+        if read_buffer_size is not None:
+            self.read_buffer_size = read_buffer_size
+            self._apply_buffer_size()
+
+    def _apply_buffer_size(self):
+        pass
+
+    def _connected(self):
+        self.connected = True
+        self.retrying = False
+        self.reconnect_delay = RECONNECT_INTERVAL
+        self.connection_changed.emit(True)
+
+    def _failed(self):
+        """ the open failed or the connection dropped, retry while it is wanted """
+        was_connected = self.connected
+        self.connected = False
+        self._close()
+        # report the first failure, not every retry after it
+        if was_connected or not self.retrying:
+            self.connection_changed.emit(False)
+        if self.wanted and self.reconnect:
+            self.retrying = True
+            self.reconnect_timer.start(self.reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_INTERVAL_MAX)
+
+    @pyqtSlot()
+    def retry(self):
+        if self.wanted and not self.connected:
+            self.reconnects += 1
+            self._open()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+    def bytes_available(self):
+        raise NotImplementedError
+
+    def read(self, max_bytes=0):
+        """ everything buffered, or at most max_bytes of it, as bytes """
+        raise NotImplementedError
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def bytes_to_write(self):
+        """ bytes written but not sent yet """
+        return 0
+
+
+class DeviceTransport(Transport):
+    """ reads and writes go straight to a QIODevice held in self.device """
+
+    def bytes_available(self):
+        return self.device.bytesAvailable()
+
+    def read(self, max_bytes=0):
+        if not max_bytes:
+            return self.device.readAll().data()
+        return bytes(self.device.read(max_bytes))
+
+    def write(self, data):
+        self.device.write(data)
+
+    def bytes_to_write(self):
+        return self.device.bytesToWrite()
+
+
+class SerialTransport(DeviceTransport):
+    def __init__(self, port_name, baud_rate=BAUD_RATE, flow_control=FLOW_NONE, **options):
+        super(SerialTransport, self).__init__(**options)
+        self.device = QtSerialPort.QSerialPort(port_name, self)
+        self.device.readyRead.connect(self.ready_read)
+        self.device.errorOccurred.connect(self.on_error)
+        self.configure(baud_rate, flow_control, self.read_buffer_size)
+
+    def configure(self, baud_rate=None, flow_control=None, read_buffer_size=None):
+        if baud_rate is not None:
+            self.baud_rate = baud_rate
+            self.device.setBaudRate(baud_rate)
+        if flow_control is not None:
+            if flow_control not in FLOW_CONTROLS:
+                raise ValueError(f"unknown flow control {flow_control!r}")
+            self.flow_control = flow_control
+            self.device.setFlowControl(FLOW_CONTROLS[flow_control])
+        super(SerialTransport, self).configure(read_buffer_size)
+
+    def _apply_buffer_size(self):
+        self.device.setReadBufferSize(self.read_buffer_size)
+
+    def _open(self):
+        if self.device.open(QIODevice.ReadWrite):
+            # some drivers only take the line settings once the port is open
+            self.device.setBaudRate(self.baud_rate)
+            self.device.setFlowControl(FLOW_CONTROLS[self.flow_control])
+            self._connected()
+        else:
+            self._failed()
+
+    def _close(self):
+        self.device.close()
+
+    @pyqtSlot(QtSerialPort.QSerialPort.SerialPortError)
+    def on_error(self, error):
+        # the device went away, e.g. the USB adapter was pulled
+        if error == QtSerialPort.QSerialPort.ResourceError and self.connected:
+            self._failed()
+
+
+class SocketTransport(DeviceTransport):
+    """ client side of a stream socket, QTcpSocket or QLocalSocket """
+
+    def __init__(self, device, **options):
+        super(SocketTransport, self).__init__(**options)
+        self.device = device
+        self.device.setParent(self)
+        self._apply_buffer_size()
+        self.device.readyRead.connect(self.ready_read)
+        self.device.connected.connect(self._connected)
+        self.device.disconnected.connect(self.on_disconnected)
+        self.device.errorOccurred.connect(self.on_error)
+
+    def _apply_buffer_size(self):
+        self.device.setReadBufferSize(self.read_buffer_size)
+
+    def _close(self):
+        self.device.abort()
+
+    @pyqtSlot()
+    def on_disconnected(self):
+        if self.connected:
+            self._failed()
+
+    def on_error(self, error):
+        if self.wanted and (self.connected or not self.reconnect_timer.isActive()):
+            self._failed()
+
+
+class TcpTransport(SocketTransport):
+    def __init__(self, host, port, **options):
+        super(TcpTransport, self).__init__(QTcpSocket(), **options)
+        self.host = host
+        self.port = port
+
+    def _open(self):
+        self.device.abort()
+        self.device.connectToHost(self.host, self.port)
+
+    def _connected(self):
+        self.device.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+        super(TcpTransport, self)._connected()
+
+
+class UnixTransport(SocketTransport):
+    def __init__(self, path, **options):
+        super(UnixTransport, self).__init__(QLocalSocket(), **options)
+        self.path = path
+
+    def _open(self):
+        self.device.abort()
+        self.device.connectToServer(self.path)
+
+
+class ServerTransport(Transport):
+    """
+    Listening side, QTcpServer or QLocalServer. It counts as connected while listening,
+    reads and writes go to the latest client, a new client replaces the previous one.
+    """
+
+    def __init__(self, server, **options):
+        super(ServerTransport, self).__init__(**options)
+        self.server = server
+        self.server.setParent(self)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.client = None
+
+    def _open(self):
+        if self._listen():
+            self._connected()
+        else:
+            self._failed()
+
+    def _close(self):
+        self._drop_client()
+        self.server.close()
+
+    def _apply_buffer_size(self):
+        if self.client is not None:
+            self.client.setReadBufferSize(self.read_buffer_size)
+
+    def _drop_client(self):
+        if self.client is not None:
+            self.client.abort()
+            self.client.deleteLater()
+            self.client = None
+
+    @pyqtSlot()
+    def on_new_connection(self):
+        client = self.server.nextPendingConnection()
+        self._drop_client()
+        self.client = client
+        client.setReadBufferSize(self.read_buffer_size)
+        client.readyRead.connect(self.ready_read)
+
+    def bytes_available(self):
+        return self.client.bytesAvailable() if self.client is not None else 0
+
+    def read(self, max_bytes=0):
+        if self.client is None:
+            return b""
+        if not max_bytes:
+            return self.client.readAll().data()
+        return bytes(self.client.read(max_bytes))
+
+    def write(self, data):
+        if self.client is not None:
+            self.client.write(data)
+
+
+class TcpServerTransport(ServerTransport):
+    def __init__(self, host, port, **options):
+        super(TcpServerTransport, self).__init__(QTcpServer(), **options)
+        self.host = host
+        self.port = port
+
+    def _listen(self):
+        return self.server.listen(QHostAddress(self.host), self.port)
+
+
+class UnixServerTransport(ServerTransport):
+    def __init__(self, path, **options):
+        super(UnixServerTransport, self).__init__(QLocalServer(), **options)
+        self.path = path
+
+    def _listen(self):
+        # a socket file left behind by a crashed run would block the listen
+        QLocalServer.removeServer(self.path)
+        return self.server.listen(self.path)
+
+
+class UdpTransport(Transport):
+    """
+    Datagrams are gathered in a buffer of at most read_buffer_size bytes, datagrams
+    arriving while it is full are dropped and counted. A sender that speaks first, like
+    the simulator, needs a peer to write to.
+    """
+
+    def __init__(self, host, port, peer=None, **options):
+        super(UdpTransport, self).__init__(**options)
+        self.host = host
+        self.port = port
+        self.device = QUdpSocket(self)
+        self.device.readyRead.connect(self.on_datagrams)
+        self.buffer = bytearray()
+        self.peer = None
+        if peer is not None:
+            peer_host, peer_port = _host_port(peer)
+            self.peer = (QHostAddress(peer_host), peer_port)
+        self.dropped_datagrams = 0
+
+    def _open(self):
+        if self.device.bind(QHostAddress(self.host), self.port):
+            self._connected()
+        else:
+            self._failed()
+
+    def _close(self):
+        self.device.close()
+        self.buffer.clear()
+
+    @pyqtSlot()
+    def on_datagrams(self):
+        while self.device.hasPendingDatagrams():
+            data, host, port = self.device.readDatagram(self.device.pendingDatagramSize())
+            self.peer = (host, port)
+            if len(self.buffer) + len(data) > self.read_buffer_size:
+                self.dropped_datagrams += 1
+                continue
+            self.buffer += data
+        if self.buffer:
+            self.ready_read.emit()
+
+    def bytes_available(self):
+        return len(self.buffer)
+
+    def read(self, max_bytes=0):
+        size = len(self.buffer) if not max_bytes else min(max_bytes, len(self.buffer))
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def write(self, data):
+        if self.peer is not None:
+            self.device.writeDatagram(data, *self.peer)
+
+
+class FileTransport(Transport):
+    """ a capture file read chunk_size bytes at a time, writes are ignored """
+
+    def __init__(self, path, chunk_size=FILE_CHUNK_SIZE, **options):
+        options["reconnect"] = False
+        super(FileTransport, self).__init__(**options)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.file = None
+        self.size = 0
+
+    def _open(self):
+        try:
+            self.file = open(self.path, "rb")
+        except OSError:
+            self._failed()
+            return
+        self.size = os.fstat(self.file.fileno()).st_size
+        self._connected()
+        QTimer.singleShot(0, self.ready_read.emit)
+
+    def _close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def bytes_available(self):
+        return self.size - self.file.tell() if self.file is not None else 0
+
+    def read(self, max_bytes=0):
+        if self.file is None:
+            return b""
+        data = self.file.read(max_bytes or self.chunk_size)
+        # let the event loop breathe between chunks instead of reading the file in one go
+        if self.bytes_available():
+            QTimer.singleShot(0, self.ready_read.emit)
+        return data
+
+    def write(self, data):
+        pass
+
+
+def _host_port(address):
+    host, _, port = address.lstrip("/").rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def parse_options(query):
+    """ the options of a spec query string as create_transport keyword arguments """
+    options = {}
+    for key, value in parse_qsl(query, strict_parsing=bool(query)):
+        if key == "baud":
+            options["baud_rate"] = int(value)
+        elif key == "flow":
+            options["flow_control"] = value
+        elif key == "buffer":
+            options["read_buffer_size"] = int(value)
+        elif key == "peer":
+            options["peer"] = value
+        else:
+            raise ValueError(f"unknown transport option {key!r}")
+    return options
+
+
+def check_options(scheme, options):
+    """
+    Raise ValueError for options a transport of scheme would refuse, so a bad spec or
+    setting is caught where it is given, not in a slot on the reader thread.
+    """
+    if scheme != TRANSPORT_SERIAL and ("baud_rate" in options or "flow_control" in options):
+        raise ValueError(f"baud and flow only apply to serial ports, not {scheme}")
+    if "peer" in options and scheme != TRANSPORT_UDP:
+        raise ValueError(f"peer only applies to udp, not {scheme}")
+    flow_control = options.get("flow_control")
+    if flow_control is not None and flow_control not in FLOW_CONTROLS:
+        raise ValueError(f"unknown flow control {flow_control!r}, use one of {tuple(FLOW_CONTROLS)}")
+    for name in ("baud_rate", "read_buffer_size"):
+        if options.get(name) is not None and options[name] <= 0:
+            raise ValueError(f"{name} must be positive, not {options[name]}")
+
+
+def split_spec(spec):
+    """
+    @return scheme, address and options of a spec, a spec without a known scheme is a
+    serial port name
+    """
+    spec, _, query = spec.partition("?")
+    scheme, separator, address = spec.partition(":")
+    if not separator or scheme not in TRANSPORT_SCHEMES:
+        scheme, address = TRANSPORT_SERIAL, spec
+    return scheme, address, parse_options(query)
+
+
+def create_transport(spec, parent=None, **options):
+    """
+    Build the transport for a spec string, see the module docstring. Keyword arguments
+    override the spec's options.
+    """
+    scheme, address, spec_options = split_spec(spec)
+    options = dict(spec_options, **options)
+    check_options(scheme, options)
+    if scheme == TRANSPORT_SERIAL:
+        transport = SerialTransport(address, **options)
+    elif scheme == TRANSPORT_TCP:
+        transport = TcpTransport(*_host_port(address), **options)
+    elif scheme == TRANSPORT_TCP_LISTEN:
+        transport = TcpServerTransport(*_host_port(address), **options)
+    elif scheme == TRANSPORT_UDP:
+        transport = UdpTransport(*_host_port(address), **options)
+    elif scheme == TRANSPORT_UNIX:
+        transport = UnixTransport(address, **options)
+    elif scheme == TRANSPORT_UNIX_LISTEN:
+        transport = UnixServerTransport(address, **options)
+    else:
+        transport = FileTransport(address, **options)
+    transport.setParent(parent)
+    return transport
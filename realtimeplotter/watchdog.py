@@ -0,0 +1,137 @@
+"""
+Watchdog
+Event loop stall detection and an on demand cProfile profiler for the GUI hot paths.
+"""
+import cProfile
+import functools
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+
+# well under the threshold, a coarse timer is accurate enough for that
+WATCHDOG_INTERVAL = 50
+WATCHDOG_THRESHOLD = 0.2
+WATCHDOG_STACK_LIMIT = 12
+
+
+class EventLoopWatchdog(QObject):
+    """
+    Reports event loop stalls longer than threshold seconds.
+    Create and start it on the GUI thread, that is the thread it watches.
+    """
+
+    # stall length in seconds, stack of the GUI thread sampled during the stall
+    stalled = pyqtSignal(float, str)
+
+    def __init__(self, threshold=WATCHDOG_THRESHOLD, interval=WATCHDOG_INTERVAL, parent=None):
+        super(EventLoopWatchdog, self).__init__(parent)
+        self.threshold = threshold
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.beat)
+        self.monitor = None
+        self.stopping = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.last_beat = time.perf_counter()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.stack = ""
+
+    def start(self):
+        self.reset()
+        self.timer.start()
+        self.stopping.clear()
+        self.monitor = threading.Thread(target=self.watch, name="event-loop-watchdog", daemon=True)
+        self.monitor.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stopping.set()
+        if self.monitor is not None:
+            self.monitor.join()
+            self.monitor = None
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    @pyqtSlot()
+    def beat(self):
+        # how late the beat is, is how long the event loop was busy elsewhere
+        now = time.perf_counter()
+        lag = now - self.last_beat - self.interval / 1000
+        self.last_beat = now
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.threshold:
+            self.stalls += 1
+            stack, self.stack = self.stack, ""
+            self.stalled.emit(lag, stack)
+
+    def watch(self):
+        """ monitor thread, samples the GUI thread once per stall """
+        sampled_beat = None
+        while not self.stopping.wait(self.threshold / 4):
+            last_beat = self.last_beat
+            if last_beat == sampled_beat or time.perf_counter() - last_beat < self.threshold:
+                continue
+            # sampled while the GUI thread is still stuck, so the stack names the code
+            # that held the loop and not whatever ran after it
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stack = "".join(traceback.format_stack(frame, limit=WATCHDOG_STACK_LIMIT))
+            sampled_beat = last_beat
+
+
+class HotPathProfiler:
+    def __init__(self):
+        self.profile = None
+        self.active = False
+
+    @property
+    def enabled(self):
+        return self.profile is not None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+
+    def stop(self, path=None):
+        """
+        stop profiling, the collected stats are written to path when given as a pstats
+        file (python -m pstats, snakeviz or flameprof). Profiling is stopped even when
+        writing them raises OSError
+        """
+        profile, self.profile = self.profile, None
+        if profile is not None and path:
+            profile.dump_stats(path)
+
+
+PROFILER = HotPathProfiler()
+
+
+def hot_path(function):
+    """
+    Profile function while PROFILER is enabled. Hot paths calling each other are
+    measured by the outermost one, the inner calls show up in its call graph.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = PROFILER.profile
+        if profile is None or PROFILER.active:
+            return function(*args, **kwargs)
+        PROFILER.active = True
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            PROFILER.active = False
+
+    return wrapper
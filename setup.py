@@ -5,7 +5,7 @@
 """
 import sys
 from PyQt5.QtWidgets import QApplication
-from realtimeplotter.real_time_plotter_widget import RealTimePlotterWidget
+from realtimeplotter.real_time_plotter_widget import RealTimePlotterWidget, COM_PORT
 from realtimeplotter.theme import ApplicationTheme
 
 
@@ -15,7 +15,8 @@ if __name__ == "__main__":
     
     app.setPalette(ApplicationTheme())
 
-    w = RealTimePlotterWidget()
+    # an optional transport spec, e.g. COM3 or tcp://192.168.1.20:5000
+    w = RealTimePlotterWidget(port_name=sys.argv[1] if len(sys.argv) > 1 else COM_PORT)
 
     """ 
     Initialise the Sliders 
@@ -1,7 +1,7 @@
 import sys
 from PyQt5.QtWidgets import QApplication
 
-from simulation.plot_simulation import LivePlotSimulator
+from simulation.plot_simulation import LivePlotSimulator, COM_PORT
 from realtimeplotter.theme import ApplicationTheme
 
 
@@ -9,7 +9,8 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     app.setPalette(ApplicationTheme())
-    w = LivePlotSimulator()
+    # an optional transport spec, e.g. COM6 or tcp-listen://127.0.0.1:5000
+    w = LivePlotSimulator(port_name=sys.argv[1] if len(sys.argv) > 1 else COM_PORT)
 
     w.show()
     sys.exit(app.exec_())
\ No newline at end of file
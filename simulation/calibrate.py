@@ -0,0 +1,231 @@
+"""
+Calibrate
+Finds the fastest serial link setting the current host sustains.
+
+The LivePlotSimulator's StreamGenerator runs in a child process and streams generated
+points into the send port a little faster than the line can carry, this process reads the
+receive port with the plotter's SerialReader. Both ends step through the standard baud
+rates together and at every rate the receiving side measures:
+
+    points_per_sec  sustained decode rate from the first to the last batch
+    error_rate      rejected records plus points that never arrived, over points sent
+    cpu             CPU seconds this process used per second, receive side only since the
+                    sender has a process of its own
+
+The best setting is the fastest one whose error rate stays under --max-error-rate.
+
+    python -m simulation.calibrate --send COM6 --receive COM5
+    python -m simulation.calibrate --virtual
+
+--virtual runs over a pty pair (Linux) instead of real ports. A pty has no line rate, so
+it exercises the tool and the receive path rather than a link.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from realtimeplotter.protocol import WIRE_FORMATS, WIRE_FORMAT_ASCII, encode_points
+from realtimeplotter.serial_reader import SerialReader
+from realtimeplotter.transports import FLOW_CONTROLS, FLOW_NONE, STANDARD_BAUD_RATES, create_transport
+from simulation.plot_simulation import StreamGenerator, scatter_points
+
+
+CALIBRATE_SECONDS = 3.0
+CALIBRATE_MAX_ERROR_RATE = 0.01
+# the sender overdrives the line by this much so the link, not the sender, is the limit
+CALIBRATE_OVERDRIVE = 1.2
+CALIBRATE_DRAIN = 1.0
+BITS_PER_BYTE = 10  # 8N1, start and stop bit on every byte
+
+
+def bytes_per_point(wire_format, rng):
+    sample = scatter_points(rng, 1000)
+    return len(encode_points(sample, wire_format)) / len(sample)
+
+
+def line_rate(baud_rate, wire_format, rng):
+    """ points per second the line carries at baud_rate """
+    return baud_rate / BITS_PER_BYTE / bytes_per_point(wire_format, rng)
+
+
+def feed(args):
+    """
+    Child process, stream points at the line rate of args.baud for args.seconds, then
+    print how many were sent as JSON.
+    """
+    app = QCoreApplication([])
+    rng = np.random.default_rng(12345)
+    sequence = [0]
+    sent = [0]
+
+    if args.feed_fd is not None:
+        def write(data):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(args.feed_fd, view):]
+        transport = None
+    else:
+        transport = create_transport(args.feed, baud_rate=args.baud, flow_control=args.flow)
+        transport.open()
+        if not transport.is_open():
+            print(json.dumps({"sent": 0, "error": f"can not open {args.feed}"}))
+            return
+        write = transport.write
+
+    def send(values):
+        write(encode_points(values, args.wire_format, sequence[0]))
+        sequence[0] += len(values)
+        sent[0] += len(values)
+
+    rate = int(line_rate(args.baud, args.wire_format, rng) * CALIBRATE_OVERDRIVE) + 1
+    stream = StreamGenerator(send, lambda count: scatter_points(rng, count), rate, max(1, rate // 50))
+    stream.start()
+
+    def finish():
+        stream.stop()
+        # whatever is still queued in the port goes out before the child exits
+        while transport is not None and transport.bytes_to_write():
+            app.processEvents()
+            time.sleep(0.01)
+        app.quit()
+
+    QTimer.singleShot(int(args.seconds * 1000), finish)
+    app.exec_()
+    print(json.dumps({"sent": sent[0]}))
+
+
+def measure(app, receive, feed_args, baud_rate, flow, wire_format, seconds, pass_fds=()):
+    """ one calibration step, @return dict of the measurements at baud_rate """
+    reader = SerialReader(receive, wire_format)
+    reader.configure(baud_rate=baud_rate, flow_control=flow)
+    received = [0]
+    first = []
+    last = [0.0, 0.0]
+
+    def on_points(values, sequence, timestamp):
+        now = time.perf_counter()
+        if not first:
+            first.extend((now, time.process_time()))
+        received[0] += len(values)
+        last[:] = now, time.process_time()
+
+    reader.points_received.connect(on_points)
+    reader.open()
+
+    command = [
+        sys.executable, "-m", "simulation.calibrate",
+        "--baud", str(baud_rate),
+        "--flow", flow,
+        "--seconds", str(seconds),
+        "--wire-format", wire_format,
+    ] + feed_args
+    child = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, pass_fds=pass_fds)
+
+    def wait_for_child():
+        if child.poll() is None:
+            QTimer.singleShot(50, wait_for_child)
+        else:
+            QTimer.singleShot(int(CALIBRATE_DRAIN * 1000), app.quit)
+
+    wait_for_child()
+    app.exec_()
+    reader.stop()
+
+    output = child.stdout.read().strip().splitlines()
+    sent = json.loads(output[-1])["sent"] if output else 0
+    stats = reader.stats
+    elapsed = last[0] - first[0] if first else 0.0
+    lost = max(sent - received[0], 0)
+    return {
+        "baud_rate": baud_rate,
+        "points_sent": sent,
+        "points_received": received[0],
+        "points_per_sec": received[0] / elapsed if elapsed else 0.0,
+        "error_rate": (stats.parse_errors + lost) / sent if sent else 1.0,
+        "cpu": (last[1] - first[1]) / elapsed if elapsed else 0.0,
+    }
+
+
+def best_setting(results, max_error_rate=CALIBRATE_MAX_ERROR_RATE):
+    usable = [row for row in results if row["points_received"] and row["error_rate"] <= max_error_rate]
+    return max(usable, key=lambda row: (row["points_per_sec"], -row["cpu"])) if usable else None
+
+
+def calibrate(send, receive, rates=STANDARD_BAUD_RATES, flow=FLOW_NONE, wire_format=WIRE_FORMAT_ASCII,
+              seconds=CALIBRATE_SECONDS, virtual=False):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    results = []
+    if virtual:
+        from simulation.virtual_link import VirtualSerialLink
+
+        link = VirtualSerialLink()
+        receive = link.port_name
+        feed_args = ["--feed-fd", str(link.master_fd)]
+        pass_fds = (link.master_fd,)
+    else:
+        link = None
+        feed_args = ["--feed", send]
+        pass_fds = ()
+    try:
+        for baud_rate in rates:
+            row = measure(app, receive, feed_args, baud_rate, flow, wire_format, seconds, pass_fds)
+            results.append(row)
+            print(
+                f"{row['baud_rate']:>8} baud {row['points_per_sec']:>12,.0f} points/s "
+                f"{row['error_rate']:>8.2%} errors {row['cpu']:>7.1%} cpu"
+            )
+    finally:
+        if link is not None:
+            link.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step through serial baud rates and report the best one")
+    parser.add_argument("--send", help="port the simulator streams into, e.g. COM6")
+    parser.add_argument("--receive", help="port the plotter reads, e.g. COM5")
+    parser.add_argument("--virtual", action="store_true", help="use a pty pair instead of real ports")
+    parser.add_argument("--rates", type=int, nargs="+", default=list(STANDARD_BAUD_RATES))
+    parser.add_argument("--flow", choices=sorted(FLOW_CONTROLS), default=FLOW_NONE)
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_FORMAT_ASCII)
+    parser.add_argument("--seconds", type=float, default=CALIBRATE_SECONDS)
+    parser.add_argument("--max-error-rate", type=float, default=CALIBRATE_MAX_ERROR_RATE)
+    parser.add_argument("--output", help="write every measurement to this JSON file")
+    # used when the tool starts its own sender
+    parser.add_argument("--feed", help=argparse.SUPPRESS)
+    parser.add_argument("--feed-fd", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--baud", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.feed or args.feed_fd is not None:
+        feed(args)
+        return
+    if not args.virtual and not (args.send and args.receive):
+        parser.error("give --send and --receive, or --virtual")
+
+    results = calibrate(
+        args.send, args.receive, args.rates, args.flow, args.wire_format, args.seconds, args.virtual
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    best = best_setting(results, args.max_error_rate)
+    if best is None:
+        print(f"no rate stayed under {args.max_error_rate:.1%} errors")
+        sys.exit(1)
+    receive = args.receive or "<port>"
+    print(
+        f"best: {receive}?baud={best['baud_rate']}&flow={args.flow} "
+        f"({best['points_per_sec']:,.0f} points/s, {best['error_rate']:.2%} errors, {best['cpu']:.1%} cpu)"
+    )
+
+
+if __name__ == "__main__":
+    main()
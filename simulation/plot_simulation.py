@@ -2,21 +2,33 @@
 LivePlotSimulator
 This package contains the LivePlotSimulator class used for simulating and testing the serial connection
 """
+import time
+from collections import deque
+from urllib.parse import parse_qsl
+
 import numpy as np
-from PyQt5 import QtSerialPort
-from PyQt5.QtCore import pyqtSlot, QTimer, QIODevice, Qt
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, QObject, QTimer, Qt
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
     QLineEdit,
-    QTextEdit,
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
+    QComboBox,
+    QSpinBox,
+    QLabel,
 )
 
+from realtimeplotter.log_console import LogConsole
+from realtimeplotter.stats import STATS_REFRESH_INTERVAL
+from simulation.scene import LidarScene
+from realtimeplotter.protocol import FRAME_SIZE, WIRE_FORMATS, WIRE_FORMAT_BINARY, WIRE_FORMAT_ASCII, encode_points
+from realtimeplotter.transports import create_transport
+
 
 COM_PORT = "COM6"
+WIRE_FORMAT = WIRE_FORMAT_ASCII
 AXIS_MIN = -20
 AXIS_MAX = 20
 
@@ -27,6 +39,22 @@ Y_AXIS_MAX = AXIS_MAX
 Z_AXIS_MIN = AXIS_MIN
 Z_AXIS_MAX = AXIS_MAX
 
+""" streaming mode """
+STREAM_RATE = 10_000
+STREAM_BURST = 500
+STREAM_RATE_MAX = 2_000_000
+STREAM_BURST_MAX = 100_000
+STREAM_SUMMARY_INTERVAL = 1.0
+STREAM_SOURCE_SCATTER = "scatter"
+STREAM_SOURCE_SCENE = "lidar scene"
+STREAM_SOURCES = (STREAM_SOURCE_SCATTER, STREAM_SOURCE_SCENE)
+
+""" fault injection, see FaultInjector """
+FAULT_BURST = 20
+FAULT_STALL_TIME = 250
+FAULT_OPTIONS = ("corrupt", "truncate", "drop", "burst", "duplicate", "reorder", "jitter", "stall", "stall_time")
+FAULT_EXAMPLE = "corrupt=0.0001&truncate=0.005&drop=0.001&stall=0.01"
+
 """ RangeFinder Class
     This class creates an instance of the rangefiner application, inclduing the layout,
     the serial connection and the plotting options. 
@@ -43,11 +71,271 @@ def GenericLayoutHelper(layout_box, arr_widgets):
     return layout_box
 
 
+def scatter_points(rng, count):
+    """ count random integer points inside the axis range """
+    return rng.integers(low=AXIS_MIN, high=AXIS_MAX, size=(count, 3))
+
+
+def demo_sphere_points():
+    """ a sphere of radius 20 as a 51 x 51 grid of integer cartesian points """
+    # create sphere parameters        
+    r = 20
+    pi = np.pi
+    cos = np.cos
+    sin = np.sin
+    phi, theta = np.mgrid[0:pi:51j, 0:2 * pi:51j]
+    
+    x = r*sin(phi)*cos(theta)
+    y = r*sin(phi)*sin(theta)
+    z = r*cos(phi)
+    return np.column_stack((x.ravel(), y.ravel(), z.ravel())).astype(int)
+
+
+class StreamGenerator(QObject):
+    """
+    Sends generated points at a target rate.
+
+    Each tick works out how many points are due since the stream started, builds them
+    as one NumPy batch and hands them to send() in one go. The tick interval is the
+    time one burst takes at the target rate, so rate sets the average and burst the
+    granularity. A summary of what was sent is emitted about once a second.
+    """
+
+    summary = pyqtSignal(str)
+
+    def __init__(self, send, source, rate=STREAM_RATE, burst=STREAM_BURST, parent=None):
+        super(StreamGenerator, self).__init__(parent)
+        self.send = send
+        self.source = source
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst):
+        self.rate = max(1, rate)
+        self.burst = max(1, burst)
+        self.timer.setInterval(max(1, int(1000 * self.burst / self.rate)))
+        if self.timer.isActive():
+            # pace the new rate from here on, the totals carry on
+            self.started = time.perf_counter()
+            self.requested = 0
+
+    def start(self):
+        self.started = time.perf_counter()
+        # points asked of the source since started, it may return fewer (lidar dropouts)
+        self.requested = 0
+        self.sent = 0
+        self.summary_at = self.started
+        self.summary_sent = 0
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    @pyqtSlot()
+    def tick(self):
+        now = time.perf_counter()
+        due = int(self.rate * (now - self.started)) - self.requested
+        backlog = due - 4 * self.burst
+        if backlog > 0:
+            # fell behind after a stall, drop what would take more than a few bursts to catch up
+            self.started += backlog / self.rate
+            due -= backlog
+        if due > 0:
+            values = self.source(due)
+            self.send(values)
+            self.requested += due
+            self.sent += len(values)
+
+        if now - self.summary_at >= STREAM_SUMMARY_INTERVAL:
+            sent = self.sent - self.summary_sent
+            self.summary.emit(
+                f"[Stream] {self.sent} points sent, {sent / (now - self.summary_at):,.0f} points/s"
+            )
+            self.summary_at = now
+            self.summary_sent = self.sent
+
+
+def parse_faults(spec):
+    """ a "name=value&..." fault spec as FaultInjector.configure keyword arguments """
+    faults = {}
+    for key, value in parse_qsl(spec, strict_parsing=bool(spec)):
+        if key not in FAULT_OPTIONS:
+            raise ValueError(f"unknown fault {key!r}, use {', '.join(FAULT_OPTIONS)}")
+        faults[key] = float(value)
+    return faults
+
+
+def record_bounds(data, wire_format):
+    """ start and end of every record in encoded uint8 data """
+    if wire_format == WIRE_FORMAT_BINARY:
+        starts = np.arange(0, len(data), FRAME_SIZE)
+        return starts, np.minimum(starts + FRAME_SIZE, len(data))
+    ends = np.flatnonzero(data == ord("\n")) + 1
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1]
+    return starts, ends
+
+
+class FaultInjector(QObject):
+    """
+    Serial noise on the encoded byte stream, each fault at its own probability:
+
+        corrupt     per byte, the byte is replaced by a random one
+        truncate    per record, the record is cut short and loses its tail
+        drop        per record, a burst of burst records starting there is lost
+        duplicate   per record, the record is sent twice
+        reorder     per record, the record swaps places with the next one
+        jitter      every batch is held back up to this many ms, order is kept
+        stall       per batch, the link stops for stall_time ms
+
+    apply() damages one batch with NumPy index operations, so the faults cost about
+    the same as the encoding. send() applies them and writes the result, batches held
+    back by jitter or a stall are written by a timer in the order they were sent.
+    Everything is off until configure() sets a probability.
+    """
+
+    def __init__(self, write=None, rng=None, parent=None):
+        super(FaultInjector, self).__init__(parent)
+        self.write = write
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.pending = deque()
+        self.stalled_until = 0.0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.release)
+        self.configure()
+        self.clear()
+
+    def configure(self, corrupt=0.0, truncate=0.0, drop=0.0, burst=FAULT_BURST, duplicate=0.0,
+                  reorder=0.0, jitter=0.0, stall=0.0, stall_time=FAULT_STALL_TIME):
+        self.corrupt = corrupt
+        self.truncate = truncate
+        self.drop = drop
+        self.burst = max(1, int(burst))
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.jitter = jitter
+        self.stall = stall
+        self.stall_time = stall_time
+
+    def clear(self):
+        self.bytes_corrupted = 0
+        self.records_truncated = 0
+        self.records_dropped = 0
+        self.records_duplicated = 0
+        self.records_reordered = 0
+        self.stalls = 0
+
+    @property
+    def enabled(self):
+        return any((self.corrupt, self.truncate, self.drop, self.duplicate, self.reorder, self.jitter, self.stall))
+
+    def summary(self):
+        return (
+            f"{self.bytes_corrupted:,} bytes corrupted, {self.records_truncated:,} truncated, "
+            f"{self.records_dropped:,} dropped, {self.records_duplicated:,} duplicated, "
+            f"{self.records_reordered:,} reordered, {self.stalls:,} stalls"
+        )
+
+    def apply(self, data, wire_format):
+        """ @return data with the record and byte faults applied """
+        rng = self.rng
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        starts, ends = record_bounds(buffer, wire_format)
+        order = np.arange(len(starts))
+
+        if self.drop:
+            # +1 where a burst starts, -1 where it ends, covered records sum above zero
+            edges = np.zeros(len(order) + 1, dtype=np.int64)
+            first = np.flatnonzero(rng.random(len(order)) < self.drop)
+            np.add.at(edges, first, 1)
+            np.add.at(edges, np.minimum(first + self.burst, len(order)), -1)
+            lost = np.cumsum(edges[:-1]) > 0
+            self.records_dropped += int(np.count_nonzero(lost))
+            order = order[~lost]
+
+        if self.reorder and len(order) > 1:
+            swap = np.flatnonzero(rng.random(len(order) - 1) < self.reorder)
+            # a record only takes part in one swap
+            swap = swap[np.diff(swap, prepend=-2) > 1]
+            order[swap], order[swap + 1] = order[swap + 1], order[swap]
+            self.records_reordered += 2 * len(swap)
+
+        if self.duplicate:
+            copies = 1 + (rng.random(len(order)) < self.duplicate)
+            self.records_duplicated += int(copies.sum()) - len(order)
+            order = np.repeat(order, copies)
+
+        lengths = ends[order] - starts[order]
+        if self.truncate:
+            cut = np.flatnonzero(rng.random(len(order)) < self.truncate)
+            lengths[cut] = rng.integers(0, lengths[cut])
+            self.records_truncated += len(cut)
+
+        # gather the kept bytes of every record in one go
+        total = int(lengths.sum())
+        offsets = np.cumsum(lengths) - lengths
+        damaged = buffer[np.repeat(starts[order] - offsets, lengths) + np.arange(total)]
+
+        if self.corrupt and total:
+            hits = rng.integers(0, total, rng.binomial(total, self.corrupt))
+            damaged[hits] = rng.integers(0, 256, len(hits), dtype=np.uint8)
+            self.bytes_corrupted += len(hits)
+        return damaged.tobytes()
+
+    def delay(self):
+        """ @return seconds to hold the next batch back for jitter and stalls """
+        now = time.perf_counter()
+        if self.stall and self.rng.random() < self.stall:
+            self.stalls += 1
+            self.stalled_until = max(self.stalled_until, now + self.stall_time / 1000)
+        jitter = self.rng.uniform(0, self.jitter / 1000) if self.jitter else 0.0
+        return max(jitter, self.stalled_until - now)
+
+    def send(self, data, wire_format):
+        """ @return the bytes that go out for data, now or once they are due """
+        if self.enabled:
+            data = self.apply(data, wire_format)
+            due = time.perf_counter() + self.delay()
+        else:
+            due = 0.0
+        if not self.pending and due <= time.perf_counter():
+            self.write(data)
+            return data
+        if self.pending:
+            # a serial line delivers in order, nothing overtakes a batch held back
+            due = max(due, self.pending[-1][0])
+        self.pending.append((due, data))
+        if not self.timer.isActive():
+            self.release()
+        return data
+
+    @pyqtSlot()
+    def release(self):
+        """ write the held batches that are due and wait for the next one """
+        now = time.perf_counter()
+        while self.pending and self.pending[0][0] <= now:
+            self.write(self.pending.popleft()[1])
+        if self.pending:
+            self.timer.start(max(0, int(1000 * (self.pending[0][0] - now))))
+
+    def discard(self):
+        """ drop the held batches, on disconnect """
+        self.pending.clear()
+        self.timer.stop()
+
 
 class LivePlotSimulator(QWidget):
     """The constructor."""
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, port_name=COM_PORT, wire_format=WIRE_FORMAT, faults=None):
         super(LivePlotSimulator, self).__init__(parent)
 
 
@@ -57,15 +345,9 @@ class LivePlotSimulator(QWidget):
         self.lineedit_message = QLineEdit()
         self.lineedit_message.setFixedSize(120, 50)
 
-        self.textedit_output = QTextEdit(readOnly=True)
+        self.textedit_output = LogConsole()
         self.textedit_output.setMinimumWidth(200)
 
-        """ Timers (ms) """
-        self.timer = QTimer(self)
-        self.timer.setInterval(100)
-        self.timer.start()
-        self.timer.timeout.connect(self.receive)
-
         """ Buttons """
         self.button_send = QPushButton(text="Send Custom Data", clicked=self.send)
         self.button_send.setFixedSize(120, 50)
@@ -82,6 +364,43 @@ class LivePlotSimulator(QWidget):
         self.button_connect.setStyleSheet("background-color: red")
         self.button_connect.setFixedSize(120, 50)
 
+        self.combobox_wire_format = QComboBox()
+        self.combobox_wire_format.addItems(WIRE_FORMATS)
+        self.combobox_wire_format.setCurrentText(wire_format)
+        self.combobox_wire_format.setFixedSize(120, 50)
+        self.combobox_wire_format.currentTextChanged.connect(self.set_wire_format)
+
+        self.spinbox_stream_rate = QSpinBox(
+            suffix=" pts/s", minimum=1, maximum=STREAM_RATE_MAX, value=STREAM_RATE
+        )
+        self.spinbox_stream_rate.setFixedSize(120, 50)
+        self.spinbox_stream_burst = QSpinBox(
+            prefix="burst ", minimum=1, maximum=STREAM_BURST_MAX, value=STREAM_BURST
+        )
+        self.spinbox_stream_burst.setFixedSize(120, 50)
+        self.combobox_stream_source = QComboBox()
+        self.combobox_stream_source.addItems(STREAM_SOURCES)
+        self.combobox_stream_source.setFixedSize(120, 50)
+        self.button_stream = QPushButton(
+            text="Start Stream", checkable=True, toggled=self.toggle_stream
+        )
+        self.button_stream.setFixedSize(120, 50)
+
+        """ Fault injection, a spec like FAULT_EXAMPLE applied to everything sent while on """
+        self.lineedit_faults = QLineEdit(placeholderText=FAULT_EXAMPLE)
+        self.lineedit_faults.setFixedSize(120, 50)
+        self.button_faults = QPushButton(
+            text="Inject Faults", checkable=True, toggled=self.toggle_faults
+        )
+        self.button_faults.setFixedSize(120, 50)
+
+        """ Sent counters, compared against the received counters of the plotter """
+        self.label_sent = QLabel()
+        self.label_sent.setFixedWidth(120)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_REFRESH_INTERVAL)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+
         """ Layout """
         HBox = QHBoxLayout(self)
 
@@ -90,8 +409,16 @@ class LivePlotSimulator(QWidget):
         vbox_buttons.addWidget(self.lineedit_message,)
         vbox_buttons.addWidget(self.button_send,)
         vbox_buttons.addWidget(self.button_connect,)
+        vbox_buttons.addWidget(self.combobox_wire_format,)
         vbox_buttons.addWidget(self.button_send_scatter_data,)
         vbox_buttons.addWidget(self.button_send_spiral_data,)
+        vbox_buttons.addWidget(self.spinbox_stream_rate,)
+        vbox_buttons.addWidget(self.spinbox_stream_burst,)
+        vbox_buttons.addWidget(self.combobox_stream_source,)
+        vbox_buttons.addWidget(self.button_stream,)
+        vbox_buttons.addWidget(self.lineedit_faults,)
+        vbox_buttons.addWidget(self.button_faults,)
+        vbox_buttons.addWidget(self.label_sent,)
 
 
         vbox_textedit = QVBoxLayout()
@@ -107,22 +434,43 @@ class LivePlotSimulator(QWidget):
         self.command_h = "h"
 
         self.plotbank = []
-
-        """ Serial Connection configuration """
-        self.serial = QtSerialPort.QSerialPort(
-            COM_PORT,
-            baudRate=QtSerialPort.QSerialPort.Baud9600,
-            readyRead=self.receive,
-        )
+        self.wire_format = wire_format
+        self.sequence = 0
+        self.points_sent = 0
+        self.bytes_sent = 0
+        self.received = b""
+
+        """ Connection configuration, a transport spec, a plain port name is a serial port
+        use tcp-listen://, unix-listen: or udp://...?peer=host:port to stand in for a
+        networked sensor head """
+        self.transport = create_transport(port_name, self)
+        self.transport.ready_read.connect(self.receive)
+        self.transport.connection_changed.connect(self.on_connection_changed)
         self.rng = np.random.default_rng(12345)
-        self.serial.open(self.serial.ReadWrite)
+        self.faults = FaultInjector(self.transport.write, self.rng, self)
+        if faults:
+            self.lineedit_faults.setText(faults)
+            self.button_faults.setChecked(True)
+        self.stream = StreamGenerator(
+            self.send_points, lambda count: scatter_points(self.rng, count), parent=self
+        )
+        self.combobox_stream_source.currentTextChanged.connect(self.set_stream_source)
+        self.stream.summary.connect(self.textedit_output.append)
+        self.spinbox_stream_rate.valueChanged.connect(self.stream_rate_change)
+        self.spinbox_stream_burst.valueChanged.connect(self.stream_rate_change)
+        self.transport.open()
+        self.refresh_stats()
+        self.stats_timer.start()
 
     """ Method to read from serial, convert the data and send it to be plotted  """
     #  @param self The object pointer
     @pyqtSlot()
     def receive(self):
-        while self.serial.canReadLine():
-            raw_input_data = self.serial.readLine().data().decode()
+        if not self.transport.bytes_available():
+            return
+        *lines, self.received = (self.received + self.transport.read()).split(b"\n")
+        for line in lines:
+            raw_input_data = line.decode("ascii", "replace")
             self.textedit_output.append(f"[Received] {raw_input_data}")
             print(f"[Received] {raw_input_data}")
 
@@ -132,40 +480,99 @@ class LivePlotSimulator(QWidget):
     @pyqtSlot()
     def send(self):
         command = f"{self.lineedit_message.text()}\r\n"
-        self.serial.write(command.encode())
+        self.transport.write(command.encode())
         self.textedit_output.append(f"[Sent] {command}")
 
     @pyqtSlot()
     def send_scatter_data(self):
-        
-        for i in range(100):
-            command = f"{self.get_random_value()},{self.get_random_value()},{self.get_random_value()}\r\n"
-            self.serial.write(command.encode())
-            self.textedit_output.append(f"[Sent] {command}")
-            #sleep(0.1)
+        values = scatter_points(self.rng, 100)
+        self.send_points(values)
+        self.textedit_output.append_points(values, "[Sent] {},{},{}")
 
     @pyqtSlot()
     def send_demo_plot(self):
-        # create sphere parameters        
-        r = 20
-        pi = np.pi
-        cos = np.cos
-        sin = np.sin
-        phi, theta = np.mgrid[0:pi:51j, 0:2 * pi:51j]
-        
-        x = r*sin(phi)*cos(theta)
-        y = r*sin(phi)*sin(theta)
-        z = r*cos(phi)
-        # loop over arrays to send sphere ass cartesian coords to plot
-        for i in range(len(x)):
-            for j in range(len(x)):
-                xdata = int(x[i][j])
-                ydata = int(y[i][j])
-                zdata = int(z[i][j])
-                
-                command = f"{xdata},{ydata},{zdata}\r\n"
-                self.serial.write(command.encode())
-                self.textedit_output.append(f"[Sent] {command}")
+        # send the whole sphere as cartesian coords to plot in one write
+        values = demo_sphere_points()
+        self.send_points(values)
+        self.textedit_output.append_points(values, "[Sent] {},{},{}")
+
+    """ Method to encode points in the selected wire format and write them in one go
+    #  @param self The object pointer
+    #  @param values (N, 3) integers"""
+
+    def send_points(self, values):
+        data = encode_points(values, self.wire_format, self.sequence)
+        # what goes on the wire after the faults, not what was encoded
+        data = self.faults.send(data, self.wire_format)
+        self.sequence += len(values)
+        self.points_sent += len(values)
+        self.bytes_sent += len(data)
+
+    @pyqtSlot()
+    def refresh_stats(self):
+        text = f"sent {self.points_sent:,} points\n{self.bytes_sent:,} bytes"
+        if self.faults.enabled:
+            faults = self.faults
+            records = (
+                faults.records_truncated + faults.records_dropped + faults.records_duplicated + faults.records_reordered
+            )
+            text += f"\nfaults {records:,} records\n{faults.bytes_corrupted:,} bytes"
+        self.label_sent.setText(text)
+
+    """ Method to start and stop damaging what is sent with the fault spec in the line edit
+    #  @param self The object pointer"""
+
+    @pyqtSlot(bool)
+    def toggle_faults(self, checked):
+        if not checked:
+            if self.faults.enabled:
+                self.textedit_output.append(f"[Faults] off, {self.faults.summary()}")
+            self.faults.configure()
+            return
+        try:
+            faults = parse_faults(self.lineedit_faults.text() or FAULT_EXAMPLE)
+        except ValueError as error:
+            self.textedit_output.append(f"[Faults] {error}")
+            self.button_faults.setChecked(False)
+            return
+        self.faults.clear()
+        self.faults.configure(**faults)
+        self.textedit_output.append(f"[Faults] on, {faults}")
+
+    """ Method to start and stop streaming generated points at the selected rate
+    #  @param self The object pointer"""
+
+    @pyqtSlot(bool)
+    def toggle_stream(self, checked):
+        self.button_stream.setText("Stop Stream" if checked else "Start Stream")
+        if checked:
+            self.stream.start()
+            self.textedit_output.append(
+                f"[Stream] started at {self.stream.rate} points/s in bursts of {self.stream.burst}"
+            )
+        else:
+            self.stream.stop()
+            self.textedit_output.append(f"[Stream] stopped after {self.stream.sent} points")
+
+    """ Method to pick what the stream sends, random cartesian points or azimuth,elevation,distance
+    samples of a synthetic LIDAR scene for receive_production
+    #  @param self The object pointer"""
+
+    @pyqtSlot(str)
+    def set_stream_source(self, source):
+        if source == STREAM_SOURCE_SCENE:
+            self.stream.source = LidarScene().source()
+        else:
+            self.stream.source = lambda count: scatter_points(self.rng, count)
+
+    @pyqtSlot()
+    def stream_rate_change(self):
+        self.stream.set_rate(self.spinbox_stream_rate.value(), self.spinbox_stream_burst.value())
+
+    @pyqtSlot(str)
+    def set_wire_format(self, wire_format):
+        self.wire_format = wire_format
+        self.textedit_output.append(f"Wire format: {wire_format}")
             
 
     """ Method to create a serial connection with the board
@@ -180,11 +587,14 @@ class LivePlotSimulator(QWidget):
             "background-color: green" if checked else "background-color: red"
         )
         if checked:
-            if not self.serial.isOpen():
-                if not self.serial.open(QIODevice.ReadWrite):
-                    self.button_connect.setChecked(False)
+            self.transport.open()
         else:
-            self.serial.close()
+            self.faults.discard()
+            self.transport.close()
+
+    @pyqtSlot(bool)
+    def on_connection_changed(self, connected):
+        self.textedit_output.append("Connection up" if connected else "Connection down")
     
     def get_random_value(self):
         return self.rng.integers(low=AXIS_MIN, high=AXIS_MAX)
@@ -197,5 +607,5 @@ class LivePlotSimulator(QWidget):
         
         command = f"{x_point},{y_point},{z_point}\r\n"
 
-        self.serial.write(command.encode())
+        self.transport.write(command.encode())
         self.textedit_output.append(f"[Sent] {command.encode()}")
\ No newline at end of file
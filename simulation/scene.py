@@ -0,0 +1,185 @@
+"""
+Scene
+Synthetic LIDAR data in the azimuth,elevation,distance format receive_production expects.
+
+A virtual PTU sits at the origin and sweeps the azimuth and elevation ranges of the custom
+scan sliders. Every ray is intersected with the whole scene at once (planes, boxes and
+vertical cylinders), the nearest hit gives the range, then range noise and dropouts are
+applied.
+
+Coordinates follow realtimeplotter.transform: phi is the azimuth, theta the elevation and
+a ray points along (sin theta cos phi, sin theta sin phi, cos theta), so the PTU looks
+down +z with y as the vertical axis of the room. Units are millimetres.
+"""
+import numpy as np
+
+from realtimeplotter.custom_scan_widget import (
+    AZIMUTH_MIN_LOW,
+    AZIMUTH_MAX_HIGH,
+    ELEVATE_MIN_LOW,
+    ELEVATE_MAX_HIGH,
+    SAMPLES_PER_LOW,
+)
+
+
+SCENE_MAX_RANGE = 10_000
+SCENE_RANGE_NOISE = 5.0
+SCENE_DROPOUT = 0.01
+SCENE_CHUNK_SIZE = 100_000
+
+
+class Plane:
+    def __init__(self, point, normal):
+        self.point = np.asarray(point, dtype=float)
+        self.normal = np.asarray(normal, dtype=float) / np.linalg.norm(normal)
+
+    def intersect(self, directions):
+        facing = directions @ self.normal
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (self.point @ self.normal) / facing
+        return np.where(t > 0, t, np.inf)
+
+
+class Box:
+    """ axis aligned box, slab test """
+
+    def __init__(self, lower, upper):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+
+    def intersect(self, directions):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1.0 / directions
+            t1 = self.lower * inverse
+            t2 = self.upper * inverse
+        near = np.nanmax(np.minimum(t1, t2), axis=1)
+        far = np.nanmin(np.maximum(t1, t2), axis=1)
+        hit = (far >= near) & (far > 0)
+        return np.where(hit, np.where(near > 0, near, far), np.inf)
+
+
+class Cylinder:
+    """ vertical cylinder around the y axis through (x, z), capped at bottom and top """
+
+    def __init__(self, x, z, radius, bottom, top):
+        self.centre = np.array([x, z], dtype=float)
+        self.radius = radius
+        self.bottom = bottom
+        self.top = top
+
+    def intersect(self, directions):
+        flat = directions[:, [0, 2]]
+        a = np.einsum("ij,ij->i", flat, flat)
+        b = -2.0 * (flat @ self.centre)
+        c = self.centre @ self.centre - self.radius ** 2
+        discriminant = b * b - 4 * a * c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            root = np.sqrt(np.where(discriminant >= 0, discriminant, np.nan))
+            near = (-b - root) / (2 * a)
+            far = (-b + root) / (2 * a)
+        t = np.where(near > 0, near, far)
+        height = t * directions[:, 1]
+        hit = (t > 0) & (height >= self.bottom) & (height <= self.top)
+        return np.where(hit, t, np.inf)
+
+
+def default_room():
+    """ a 4 x 3 m room with the far wall 6 m away, two boxes and a pillar """
+    return [
+        Plane([0, -1500, 0], [0, 1, 0]),
+        Plane([0, 1500, 0], [0, -1, 0]),
+        Plane([-2000, 0, 0], [1, 0, 0]),
+        Plane([2000, 0, 0], [-1, 0, 0]),
+        Plane([0, 0, 6000], [0, 0, -1]),
+        Box([-1200, -1500, 2500], [-400, -700, 3300]),
+        Box([500, -1500, 3500], [1500, 200, 4200]),
+        Cylinder(200, 1800, 250, -1500, 1500),
+    ]
+
+
+class LidarScene:
+    """
+    Ray casts a scene from a PTU at the origin.
+    @param shapes objects with intersect(directions) -> ray parameter t or inf
+    """
+
+    def __init__(
+        self,
+        shapes=None,
+        range_noise=SCENE_RANGE_NOISE,
+        dropout=SCENE_DROPOUT,
+        max_range=SCENE_MAX_RANGE,
+        seed=12345,
+    ):
+        self.shapes = default_room() if shapes is None else shapes
+        self.range_noise = range_noise
+        self.dropout = dropout
+        self.max_range = max_range
+        self.rng = np.random.default_rng(seed)
+
+    def orientations(
+        self,
+        azimuth=(AZIMUTH_MIN_LOW, AZIMUTH_MAX_HIGH),
+        elevation=(ELEVATE_MIN_LOW, ELEVATE_MAX_HIGH),
+        step=1,
+        samples=SAMPLES_PER_LOW,
+    ):
+        """
+        (N, 2) integer azimuth, elevation pairs in PTU sweep order, each repeated
+        samples times. Elevation steps on every line, azimuth once per line.
+        """
+        azimuths = np.arange(azimuth[0], azimuth[1] + 1, step)
+        elevations = np.arange(elevation[0], elevation[1] + 1, step)
+        grid = np.stack(np.meshgrid(azimuths, elevations, indexing="ij"), axis=-1).reshape(-1, 2)
+        return np.repeat(grid, samples, axis=0)
+
+    def cast(self, orientations):
+        """
+        @param orientations (N, 2) azimuth, elevation in degrees
+        @return (M, 3) int azimuth, elevation, distance, dropouts removed
+        """
+        phi = np.radians(orientations[:, 0])
+        theta = np.radians(orientations[:, 1])
+        directions = np.column_stack(
+            (np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta))
+        )
+
+        distance = np.full(len(directions), np.inf)
+        for shape in self.shapes:
+            np.minimum(distance, shape.intersect(directions), out=distance)
+
+        distance += self.rng.normal(0.0, self.range_noise, len(distance))
+        keep = (
+            np.isfinite(distance)
+            & (distance > 0)
+            & (distance <= self.max_range)
+            & (self.rng.random(len(distance)) >= self.dropout)
+        )
+        samples = np.empty((int(keep.sum()), 3), dtype=np.int64)
+        samples[:, :2] = orientations[keep]
+        samples[:, 2] = np.rint(distance[keep])
+        return samples
+
+    def sweep(self, chunk_size=SCENE_CHUNK_SIZE, **sweep):
+        """
+        Yield one full PTU sweep in chunks of at most chunk_size orientations,
+        keyword arguments go to orientations().
+        """
+        orientations = self.orientations(**sweep)
+        for start in range(0, len(orientations), chunk_size):
+            yield self.cast(orientations[start:start + chunk_size])
+
+    def source(self, **sweep):
+        """
+        A callable returning the next count samples of a never ending sweep,
+        usable as the StreamGenerator source.
+        """
+        orientations = self.orientations(**sweep)
+        position = [0]
+
+        def next_samples(count):
+            index = (position[0] + np.arange(count)) % len(orientations)
+            position[0] = (position[0] + count) % len(orientations)
+            return self.cast(orientations[index])
+
+        return next_samples
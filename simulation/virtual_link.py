@@ -0,0 +1,207 @@
+"""
+VirtualLink
+A pseudo-terminal pair standing in for the com0com virtual ports on Linux.
+
+The plotter side opens the pty slave by name like any other serial port, the generator
+side writes straight into the master. Run headless to push generated points through the
+real SerialReader and report throughput and latency:
+
+    python -m simulation.virtual_link --points 200000 --wire-format binary
+    python -m simulation.virtual_link --faults "corrupt=0.0001&drop=0.001&stall=0.01"
+
+The GUI can be pointed at a link as well, RealTimePlotterWidget(port_name=link.port_name).
+"""
+import argparse
+import os
+import select
+import threading
+import time
+import tty
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from realtimeplotter.protocol import WIRE_FORMATS, WIRE_FORMAT_ASCII, encode_points
+from realtimeplotter.serial_reader import SerialReader
+from simulation.plot_simulation import FaultInjector, parse_faults, scatter_points
+
+
+LINK_BATCH_SIZE = 1000
+LINK_TIMEOUT = 30.0
+# with faults not every point arrives, the run ends once the link has been quiet this long
+LINK_IDLE = 1.0
+
+
+class VirtualSerialLink:
+    """
+    One pty pair. port_name is the slave device for the reader, write() and read()
+    act on the master end.
+    """
+
+    def __init__(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        # no echo and no CR/LF translation, the bytes arrive exactly as written
+        tty.setraw(self.slave_fd)
+        tty.setraw(self.master_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+
+    def write(self, data):
+        """ blocks until the reader side has taken everything """
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.master_fd, view):]
+
+    def read(self, size=65536, timeout=0.0):
+        """ bytes the reader side wrote back (commands), empty when there are none """
+        ready, _, _ = select.select([self.master_fd], [], [], timeout)
+        return os.read(self.master_fd, size) if ready else b""
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LinkFeeder(threading.Thread):
+    """
+    Writes generated points into the link from its own thread and logs when each
+    batch went out, so the receive side can work out latency from sequence numbers.
+    """
+
+    def __init__(self, link, batches, wire_format, faults=None):
+        super(LinkFeeder, self).__init__(daemon=True)
+        self.link = link
+        self.batches = batches
+        self.wire_format = wire_format
+        self.faults = faults
+        self.sent_until = []
+        self.sent_at = []
+
+    def run(self):
+        sequence = 0
+        for values in self.batches:
+            data = encode_points(values, self.wire_format, sequence)
+            if self.faults is not None:
+                data = self.faults.apply(data, self.wire_format)
+                time.sleep(self.faults.delay())
+            sequence += len(values)
+            self.sent_at.append(time.time())
+            self.sent_until.append(sequence)
+            self.link.write(data)
+
+
+def run_link(batches, wire_format=WIRE_FORMAT_ASCII, timeout=LINK_TIMEOUT, sink=None, faults=None):
+    """
+    Push batches of (N, 3) integer points through a virtual link into a SerialReader.
+    @param sink optional callable given every received (N, 3) batch on the main thread,
+    e.g. a Plotter's add_items, its cost is part of the measured latency
+    @param faults optional FaultInjector applied to every batch on its way into the link
+    @return dict with points sent and received, points delivered (received without the
+    duplicates faults sent), records the reader rejected, elapsed seconds, points per
+    second and batch latency percentiles in milliseconds
+    """
+    app = QCoreApplication.instance() or QCoreApplication([])
+    batches = list(batches)
+    expected = sum(len(values) for values in batches)
+    received = []
+    sequences = []
+    latencies = []
+    last = [0.0]
+
+    with VirtualSerialLink() as link:
+        reader = SerialReader(link.port_name, wire_format)
+        feeder = LinkFeeder(link, batches, wire_format, faults)
+
+        def on_points(values, sequence, timestamp):
+            received.append(len(values))
+            sequences.append(sequence)
+            last[0] = time.perf_counter()
+            if sink is not None:
+                sink(values)
+            # the batch holding the newest point went out at sent_at[index]
+            index = int(np.searchsorted(feeder.sent_until, sequence[-1], side="right"))
+            if index < len(feeder.sent_at):
+                latencies.append(time.time() - feeder.sent_at[index])
+            # duplicated records could make up for lost ones, faulty runs wait for the link to go quiet
+            if faults is None and sum(received) >= expected:
+                app.quit()
+
+        def on_connection(connected):
+            if not connected:
+                app.quit()
+                return
+            start[0] = time.perf_counter()
+            feeder.start()
+
+        def check_idle():
+            if feeder.ident is not None and not feeder.is_alive():
+                if time.perf_counter() - max(last[0], start[0]) > LINK_IDLE:
+                    app.quit()
+
+        start = [time.perf_counter()]
+        reader.points_received.connect(on_points)
+        reader.connection_changed.connect(on_connection)
+        reader.open()
+        idle = QTimer()
+        idle.timeout.connect(check_idle)
+        if faults is not None:
+            idle.start(100)
+        QTimer.singleShot(int(timeout * 1000), app.quit)
+        app.exec_()
+        idle.stop()
+        elapsed = (last[0] if faults is not None and received else time.perf_counter()) - start[0]
+        # stopping closes the port, its queued connection_changed must not end the next run
+        reader.connection_changed.disconnect(on_connection)
+        reader.points_received.disconnect(on_points)
+        reader.stop()
+
+    # a duplicated record counts once, sequenced formats tell by the sequence number and
+    # for the others the injector's count of the duplicates it sent is taken off
+    if reader.worker.decoder.sequenced:
+        delivered = len(np.unique(np.concatenate(sequences))) if sequences else 0
+    else:
+        delivered = max(sum(received) - (faults.records_duplicated if faults is not None else 0), 0)
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "points_sent": expected,
+        "points_received": sum(received),
+        "points_delivered": delivered,
+        "rejected": reader.stats.parse_errors,
+        "seconds": elapsed,
+        "points_per_sec": sum(received) / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream generated points over a pty link into the plotter's reader")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=LINK_BATCH_SIZE)
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_FORMAT_ASCII)
+    parser.add_argument("--faults", help='fault spec, e.g. "corrupt=0.0001&stall=0.01"')
+    args = parser.parse_args()
+    faults = None
+    if args.faults:
+        faults = FaultInjector()
+        faults.configure(**parse_faults(args.faults))
+
+    rng = np.random.default_rng(12345)
+    batches = [
+        scatter_points(rng, min(args.batch_size, args.points - start))
+        for start in range(0, args.points, args.batch_size)
+    ]
+    for name, value in run_link(batches, args.wire_format, faults=faults).items():
+        print(f"{name:>16}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()